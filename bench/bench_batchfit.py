@@ -0,0 +1,70 @@
+""" Compare fitting NTC channels one by one with `curve_fit` and all at once.
+
+The channels are synthesized around the NTC1 fit of lab3/measurements.txt:
+every channel gets its own a and b and 1 % multiplicative noise on the PT100
+temperatures of the measurement.
+
+Usage: python bench/bench_batchfit.py [n_channels]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy.optimize import curve_fit
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from common import cache
+from common.batchfit import fit_channels
+from common.models import exp_func, exp_jac, ntc_seed
+from common.schema import MEASUREMENTS
+
+
+def plain_loop_fit(t, channels):
+    # How lab3/vis.py fitted the NTCs before the analytic Jacobians
+    return [curve_fit(exp_func, t, r, bounds=(0, np.inf)) for r in channels]
+
+
+def loop_fit(t, channels):
+    return [curve_fit(exp_func, t, r, p0=ntc_seed(t, r), jac=exp_jac) for r in channels]
+
+
+def main():
+    n_channels = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    data = cache.load(ROOT / 'lab3' / 'measurements.txt', MEASUREMENTS)
+    t = np.asarray(data['pt100'], dtype=np.float64)
+    rng = np.random.default_rng(0)
+    a = 0.0155 * rng.uniform(0.8, 1.2, n_channels)
+    b = 3513 * rng.uniform(0.95, 1.05, n_channels)
+    channels = exp_func(t, a[:, None], b[:, None]) * (1 + 0.01 * rng.standard_normal((n_channels, t.size)))
+
+    # Too slow to run on every channel, extrapolated from a few
+    n_plain = min(n_channels, 50)
+    start = time.perf_counter()
+    plain_loop_fit(t, channels[:n_plain])
+    t_plain = (time.perf_counter() - start) * n_channels / n_plain
+
+    start = time.perf_counter()
+    loop = loop_fit(t, channels)
+    t_loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fit = fit_channels('exp', t, channels)
+    t_batch = time.perf_counter() - start
+
+    popt = np.array([p for p, _ in loop])
+    assert fit.converged.all()
+    assert np.allclose(fit.popt, popt, rtol=1e-6)
+
+    print(f"channels x samples: {n_channels} x {t.size}")
+    print(f"curve_fit loop:     {t_plain:.3f} s (bounded, numerical Jacobian)")
+    print(f"curve_fit loop:     {t_loop:.3f} s (seeded, analytic Jacobian)")
+    print(f"batched:            {t_batch:.3f} s in at most {fit.nit.max()} iterations")
+    print(f"speedup:            {t_plain / t_batch:.0f}x / {t_loop / t_batch:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+""" Throughput of applying calibrations in place on one core.
+
+Usage: python bench/bench_calibration.py [n_samples]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from common.calibration import KingsLaw, Linear, NtcBeta, SteinhartHart, Table
+from common.models import voltage_divider
+
+
+def main():
+    n_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000_000
+
+    rng = np.random.default_rng(0)
+    cases = [
+        ('linear (lidar cm)', Linear(0.939, -0.092), rng.uniform(30, 80, n_samples)),
+        ('NTC beta (Ohm)', NtcBeta(0.0155, 3512.8), rng.uniform(100, 20000, n_samples)),
+        ('Steinhart-Hart (Ohm)', SteinhartHart(1.55e-3, 2.04e-4, 5.64e-7), rng.uniform(100, 20000, n_samples)),
+        ("King's law (V)", KingsLaw(0.0013, 0.05), rng.uniform(0.49, 0.6, n_samples)),
+        ('table (divider V)', Table.invert(lambda t: voltage_divider(t, 949.15, 4147.11), -40, 125),
+         rng.uniform(0.5, 4.5, n_samples)),
+    ]
+    for name, calibration, raw in cases:
+        for dtype in (np.float32, np.float64):
+            values = raw.astype(dtype)
+            start = time.perf_counter()
+            calibration(values, out=values)
+            elapsed = time.perf_counter() - start
+            print(f"{name:22s} {np.dtype(dtype).name:8s} {n_samples / elapsed / 1e6:7.0f} M samples/s")
+
+
+if __name__ == '__main__':
+    main()
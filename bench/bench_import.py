@@ -0,0 +1,96 @@
+""" Guard the import cost of the analysis modules.
+
+Every module is imported in a fresh interpreter. The script fails if an
+import pulls in matplotlib or scipy, or takes longer than the budget, so cheap
+helpers such as ``compute_FOV`` stay cheap for cron jobs.
+
+Usage: python bench/bench_import.py [budget_ms]
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# (directory put on sys.path, module name)
+MODULES = [
+    ('.', 'common.parser'),
+    ('.', 'common.schema'),
+    ('.', 'common.stream'),
+    ('.', 'common.stats'),
+    ('.', 'common.cache'),
+    ('.', 'common.lod'),
+    ('.', 'common.ringbuffer'),
+    ('.', 'common.models'),
+    ('.', 'common.batchfit'),
+    ('.', 'common.calibration'),
+    ('.', 'common.design'),
+    ('.', 'common.edges'),
+    ('.', 'common.segment'),
+    ('.', 'common.spectrum'),
+    ('.', 'common.timebase'),
+    ('.', 'common.wallclock'),
+    ('.', 'common.xcorr'),
+    ('.', 'common.filters'),
+    ('.', 'common.kalman'),
+    ('lab3', 'vis'),
+    ('lab3', 'soak'),
+    ('lab4', 'vis'),
+    ('lab4', 'linearization'),
+    ('lab4', 'fov'),
+    ('lab4', 'snr'),
+    ('lab4', 'latency'),
+    ('lab4', 'fusion'),
+]
+
+HEAVY = ('matplotlib', 'scipy')
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {path!r})
+start = time.perf_counter()
+import numpy
+numpy_done = time.perf_counter()
+__import__({module!r})
+end = time.perf_counter()
+print(json.dumps({{
+    'numpy_ms': (numpy_done - start) * 1000,
+    'module_ms': (end - numpy_done) * 1000,
+    'heavy': sorted({{m.split('.')[0] for m in sys.modules}} & set({heavy!r})),
+}}))
+"""
+
+
+def probe(path, module, repeat=3):
+    results = []
+    for _ in range(repeat):
+        code = PROBE.format(path=str(ROOT / path), module=module, heavy=HEAVY)
+        out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                             capture_output=True, text=True).stdout
+        results.append(json.loads(out))
+    return min(results, key=lambda r: r['module_ms'])
+
+
+def main():
+    # numpy itself is imported up front and not counted against the budget
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 50.0
+
+    failed = False
+    for path, module in MODULES:
+        result = probe(path, module)
+        problems = []
+        if result['heavy']:
+            problems.append(f"imports {', '.join(result['heavy'])}")
+        if result['module_ms'] > budget_ms:
+            problems.append(f"over budget of {budget_ms:.0f} ms")
+        failed |= bool(problems)
+        name = f"{path}/{module}" if path != '.' else module
+        status = 'FAIL ' + '; '.join(problems) if problems else 'ok'
+        print(f"{name:24s} {result['module_ms']:7.1f} ms  {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
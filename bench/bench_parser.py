@@ -0,0 +1,92 @@
+""" Compare the old per-number parsing loop with the vectorized parser.
+
+The input is lab4/snr.txt repeated until it reaches the requested number of
+lines, so it has exactly the shape of a real lidar/ultrasonic recording.
+
+Usage: python bench/bench_parser.py [n_lines] [workers]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from common.parser import read_columns
+from common.schema import RECORDING
+
+
+def legacy_parse(file_name):
+    # The loop lab4/data_parser.py used before the shared parser
+    numbers = []
+    with open(file_name, 'r') as file:
+        for line in file:
+            for num in line.split(' '):
+                numbers.append(int(num))
+
+    timestamp, ultras, lidar = [], [], []
+    for i in range(int(len(numbers) / 4)):
+        for j in range(4):
+            if j == 0:
+                timestamp.append(numbers[i * 4 + j])
+            if j == 1:
+                ultras.append(numbers[i * 4 + j])
+            if j == 2:
+                lidar.append(numbers[i * 4 + j])
+    return timestamp, ultras, lidar
+
+
+def vectorized_parse(file_name):
+    return read_columns(file_name, RECORDING)
+
+
+def parallel_parse(file_name, workers):
+    return read_columns(file_name, RECORDING, workers=workers, min_part_bytes=1 << 20)
+
+
+def best_of(func, *args, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+
+    source = (ROOT / 'lab4' / 'snr.txt').read_bytes().splitlines(keepends=True)
+    lines = (source * (n_lines // len(source) + 1))[:n_lines]
+
+    with tempfile.NamedTemporaryFile(suffix='.txt') as file:
+        file.write(b''.join(lines))
+        file.flush()
+
+        legacy = legacy_parse(file.name)
+        columns = vectorized_parse(file.name)
+        assert np.array_equal(legacy[0], columns['t'])
+        assert np.array_equal(legacy[1], columns['ultra_sound'])
+        assert np.array_equal(legacy[2], columns['lidar'])
+        parallel = parallel_parse(file.name, workers)
+        assert all(np.array_equal(columns[k], parallel[k]) for k in columns)
+
+        t_legacy = best_of(legacy_parse, file.name)
+        t_vectorized = best_of(vectorized_parse, file.name)
+        t_parallel = best_of(parallel_parse, file.name, workers)
+
+    print(f"lines:      {n_lines}")
+    print(f"legacy:     {t_legacy:.3f} s")
+    print(f"vectorized: {t_vectorized:.3f} s")
+    print(f"speedup:    {t_legacy / t_vectorized:.1f}x")
+    print(f"parallel:   {t_parallel:.3f} s with {workers} workers "
+          f"({t_vectorized / t_parallel:.1f}x over vectorized)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+""" Render every report figure headlessly into PNG files.
+
+Each lab script lists its figures in a ``figures()`` function as
+(name, function, kwargs, inputs) tuples. A figure is written next to its
+script as ``name.png`` by a pool of worker processes using the Agg backend.
+
+A figure is skipped when its key is the same as in the previous run. The key
+hashes the contents of the input files, the kwargs (which carry the fitted
+parameters), the source of the drawing code including the repository helpers
+it calls, the ``SCHEMA`` the inputs are read with, the source of the modules
+that read them (`DATA_MODULES`) and the output settings. Figures whose drawing
+code captures state that cannot be hashed are rendered every time.
+
+The caches of the input files are brought up to date in the parent process
+before any figure is submitted, using the ``SCHEMA`` of the script, so the
+workers only read them and never build the same cache at the same time.
+
+Usage: python -m common.batch [--force] [--workers N] [script ...]
+"""
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from common import cache
+from common.cache import file_hash
+from common.fingerprint import ROOT, UnhashableState, code_hash, data_hash
+
+SCRIPTS = ['lab3/vis.py', 'lab4/vis.py', 'lab4/linearization.py']
+MANIFEST = '.render_cache.json'
+DPI = 100
+# Modules that turn the input files into the arrays the figures draw. The
+# drawing code reaches them through module attributes like `cache.load`,
+# which `code_hash` does not follow
+DATA_MODULES = ['common/parser.py', 'common/cache.py', 'common/schema.py']
+
+_modules = {}
+
+
+def load_script(path):
+    """ Import a lab script by path; the scripts share names like vis.py. """
+
+    path = Path(path).resolve()
+    if path not in _modules:
+        name = f'_figures_{path.parent.name}_{path.stem}'
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        _modules[path] = module
+    return _modules[path]
+
+
+def figure_key(plot, kwargs, inputs, input_hashes, schema=None):
+    """ Hash of everything a figure depends on.
+
+    Args:
+        plot, kwargs, inputs: an entry of ``figures()``
+        input_hashes: dict of file hashes by resolved path, filled as a cache
+        schema: `common.schema.Schema` the inputs are read with
+    """
+
+    import matplotlib
+
+    digest = hashlib.sha256()
+    for path in [*inputs, *(ROOT / module for module in DATA_MODULES)]:
+        path = Path(path).resolve()
+        if path not in input_hashes:
+            input_hashes[path] = file_hash(path)
+        digest.update(input_hashes[path].encode())
+    data_hash(kwargs, schema, digest=digest)
+    code_hash(plot, digest=digest)
+    digest.update(f'{matplotlib.__version__} dpi={DPI}'.encode())
+    return digest.hexdigest()
+
+
+def render_all(scripts=SCRIPTS, workers=None, force=False):
+    """ Render the figures of *scripts*, skipping unchanged ones.
+
+    Returns:
+        list of the PNG files that were written
+    """
+
+    jobs = []
+    input_hashes = {}
+    schemas = {}
+    manifests = {}
+    for script in scripts:
+        script = (ROOT / script).resolve()
+        manifest_path = script.parent / MANIFEST
+        if manifest_path not in manifests:
+            try:
+                manifests[manifest_path] = json.loads(manifest_path.read_text())
+            except (OSError, ValueError):
+                manifests[manifest_path] = {}
+        manifest = manifests[manifest_path]
+
+        module = load_script(script)
+        for name, plot, kwargs, inputs in module.figures():
+            target = script.parent / f'{name}.png'
+            try:
+                key = figure_key(plot, kwargs, inputs, input_hashes, getattr(module, 'SCHEMA', None))
+            except UnhashableState:
+                # Rendered every time
+                key = None
+            if not force and key is not None and target.exists() and manifest.get(target.name) == key:
+                continue
+            if getattr(module, 'SCHEMA', None) is not None:
+                schemas.update((Path(path).resolve(), module.SCHEMA) for path in inputs)
+            jobs.append((str(script), plot.__name__, kwargs, str(target), key, manifest_path))
+
+    # Workers loading a cold or stale cache at once would rebuild it in parallel
+    for path, schema in schemas.items():
+        cache.update(path, schema)
+
+    written = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(_render, *job[:4]) for job in jobs]
+            for job, future in zip(jobs, futures):
+                future.result()
+                target, key, manifest_path = job[3], job[4], job[5]
+                if key is None:
+                    manifests[manifest_path].pop(Path(target).name, None)
+                else:
+                    manifests[manifest_path][Path(target).name] = key
+                written.append(target)
+
+    for manifest_path, manifest in manifests.items():
+        manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return written
+
+
+def _init_worker():
+    import matplotlib
+
+    matplotlib.use('Agg')
+
+
+def _render(script, function, kwargs, target):
+    import matplotlib.pyplot as plt
+
+    fig = getattr(load_script(script), function)(**kwargs)
+    fig.savefig(target, dpi=DPI)
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('scripts', nargs='*', default=SCRIPTS)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--force', action='store_true', help='render unchanged figures too')
+    args = parser.parse_args()
+
+    # The figure lists are built here as well, e.g. to fit parameters
+    _init_worker()
+    written = render_all(args.scripts, args.workers, args.force)
+    for target in written:
+        print(f"Rendered {Path(target).relative_to(ROOT)}")
+    print(f"{len(written)} figure(s) rendered")
+
+
+if __name__ == '__main__':
+    main()
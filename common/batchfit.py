@@ -0,0 +1,163 @@
+""" Fit one model to many sensor channels at once.
+
+Every channel is a row of a (channels, samples) array. All rows are solved
+together by a vectorized Levenberg–Marquardt iteration: the residuals,
+Jacobians and normal equations of the channels are computed as stacked
+arrays, so the cost per iteration is a few numpy calls instead of one
+`curve_fit` call per channel.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from common import models
+
+# name -> (model, Jacobian, closed-form starting point)
+MODELS = {
+    'exp': (models.exp_func, models.exp_jac, models.ntc_seed),
+    'linear': (models.linear_func, models.linear_jac, models.linear_seed),
+    'kings_law': (models.kings_law, models.kings_law_jac, models.kings_law_seed),
+}
+
+
+@dataclass
+class BatchFit:
+    """ Result of `fit_batch`, one row per channel.
+
+    Attributes:
+        popt: (channels, params) fitted parameters, NaN if there are fewer
+            samples than parameters or the channel has non-finite residuals
+            at the starting point (NaN samples, log of a non-positive value)
+        pcov: (channels, params, params) covariances, scaled like `curve_fit`
+            does by default, NaN for the channels without parameters
+        converged: (channels,) True where the relative change of the cost or
+            of the parameters dropped below the tolerance, False for the
+            channels without parameters
+        nit: (channels,) iterations used
+        cost: (channels,) sum of squared residuals
+    """
+
+    popt: np.ndarray
+    pcov: np.ndarray
+    converged: np.ndarray
+    nit: np.ndarray
+    cost: np.ndarray
+
+    def __len__(self):
+        return len(self.popt)
+
+
+def fit_batch(func, jac, x, y, p0, max_iter=200, ftol=1.49012e-8, xtol=1.49012e-8, damping=1e-3):
+    """ Least-squares fit of `func(x, *params)` to every row of *y*.
+
+    Args:
+        func: model written with numpy operations, e.g. `common.models.exp_func`
+        jac: its Jacobian with the parameters on the last axis, e.g. `common.models.exp_jac`
+        x: (samples,) shared by all channels or (channels, samples)
+        y: (channels, samples) measured values
+        p0: (params,) or (channels, params) starting point
+        max_iter: iterations before a channel is given up as not converged
+        ftol: relative reduction of the cost counted as converged
+        xtol: relative parameter step counted as converged
+        damping: initial Levenberg–Marquardt damping factor
+
+    Returns:
+        `BatchFit`
+    """
+
+    y = np.atleast_2d(np.asarray(y, dtype=np.float64))
+    x = np.asarray(x, dtype=np.float64)
+    n_channels, n_samples = y.shape
+    p = np.array(np.broadcast_to(p0, (n_channels, np.shape(p0)[-1])), dtype=np.float64)
+    n_params = p.shape[1]
+
+    def rows(idx):
+        return x if x.ndim == 1 else x[idx]
+
+    def residuals(idx, params):
+        return func(rows(idx), *params.T[..., None]) - y[idx]
+
+    lam = np.full(n_channels, damping)
+    nit = np.zeros(n_channels, dtype=np.int64)
+    converged = np.zeros(n_channels, dtype=bool)
+    r_all = residuals(slice(None), p)
+    cost = np.square(r_all).sum(axis=1)
+
+    active = np.flatnonzero(np.isfinite(cost))
+    if n_samples < n_params:
+        active = active[:0]
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        params = p[active]
+        r = r_all[active]
+        J = np.broadcast_to(jac(rows(active), *params.T[..., None]), r.shape + (n_params,))
+        JT = J.swapaxes(1, 2)
+        A = JT @ J
+        g = (JT @ r[..., None])[..., 0]
+
+        # Marquardt's scaling by the diagonal keeps badly scaled parameters
+        # (e.g. a ~ 1e-2 and b ~ 1e3 of exp_func) well conditioned
+        diag = np.einsum('cii->ci', A)
+        diag = np.maximum(diag, 1e-12 * diag.max(axis=1, keepdims=True) + np.finfo(float).tiny)
+        A[:, np.arange(n_params), np.arange(n_params)] += lam[active, None] * diag
+        step = -np.linalg.solve(A, g[..., None])[..., 0]
+
+        new_params = params + step
+        new_r = residuals(active, new_params)
+        new_cost = np.square(new_r).sum(axis=1)
+        old_cost = cost[active]
+        better = np.isfinite(new_cost) & (new_cost <= old_cost)
+
+        p[active[better]] = new_params[better]
+        r_all[active[better]] = new_r[better]
+        cost[active[better]] = new_cost[better]
+        lam[active] = np.where(better, lam[active] / 10, lam[active] * 10)
+        nit[active] += 1
+
+        small_cost = better & (old_cost - new_cost <= ftol * old_cost)
+        small_step = np.linalg.norm(step, axis=1) <= xtol * (xtol + np.linalg.norm(params, axis=1))
+        done = small_cost | small_step | (old_cost == 0)
+        converged[active[done]] = True
+        active = active[~done]
+
+    # Channels with NaN samples or a NaN seed (e.g. the log of a non-positive
+    # resistance) were never iterated, they get no parameters at all
+    good = np.isfinite(cost) & np.isfinite(p).all(axis=1)
+    popt = np.where(good[:, None], p, np.nan)
+    converged &= good
+    pcov = np.full((n_channels, n_params, n_params), np.inf)
+    pcov[~good] = np.nan
+    if n_samples < n_params:
+        popt[:] = np.nan
+    elif n_samples > n_params and good.any():
+        idx = np.flatnonzero(good)
+        J = np.broadcast_to(jac(rows(idx), *popt[idx].T[..., None]), (idx.size, n_samples, n_params))
+        A = J.swapaxes(1, 2) @ J
+        finite = np.isfinite(A).all(axis=(1, 2))
+        pcov[idx[~finite]] = np.nan
+        idx, A = idx[finite], A[finite]
+        with np.errstate(invalid='ignore'):
+            pcov[idx] = np.linalg.pinv(A) * (cost[idx] / (n_samples - n_params))[:, None, None]
+    return BatchFit(popt, pcov, converged, nit, cost)
+
+
+def fit_channels(model, x, y, p0=None, **kwargs):
+    """ Fit one of the `MODELS` to every row of *y*.
+
+    Starts from the closed-form fit of each channel unless *p0* is given.
+
+    Example:
+        >>> fit = fit_channels('exp', pt100, ntc)  # ntc: (channels, samples) in Ohm
+        >>> a, b = fit.popt.T
+
+    Returns:
+        `BatchFit`
+    """
+
+    func, jac, seed = MODELS[model]
+    if p0 is None:
+        # Bad channels get a NaN seed and are reported by fit_batch
+        with np.errstate(invalid='ignore', divide='ignore'):
+            p0 = seed(x, y)
+    return fit_batch(func, jac, x, y, p0, **kwargs)
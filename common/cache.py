@@ -0,0 +1,287 @@
+""" Memory-mapped columnar cache of text recordings.
+
+Every column of ``name.txt`` is stored as a flat binary file in the
+``name.txt.cache`` directory next to it, together with ``meta.json`` holding
+the dtypes, the row count and the size, mtime and hash of the source file.
+Opening a cached recording maps the column files read-only, so it costs the
+same for ten rows and for a hundred million.
+
+Recordings that a device keeps appending to are not parsed again from the
+start: when the source only grew, the rows after the last parsed line are
+appended to the column files and the rest of the cache is left alone.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from common.parser import parse_bytes
+
+VERSION = 3
+META = 'meta.json'
+# Bytes before the parsed end of the source that must not change for an append
+EDGE_BYTES = 4096
+
+
+def cache_dir(source):
+    source = Path(source)
+    return source.with_name(source.name + '.cache')
+
+
+def load(source, schema):
+    """ Open the cached columns of *source*, rebuilding the cache if stale.
+
+    Args:
+        source: path to the text recording
+        schema: `common.schema.Schema` describing the line layout
+
+    Returns:
+        dict mapping column name to a read-only `numpy.memmap`
+    """
+
+    return open_columns(source, update(source, schema))
+
+
+def update(source, schema):
+    """ Bring the cache of *source* up to date and return its metadata.
+
+    Nothing is parsed when the source is unchanged. When it only grew (the
+    bytes just before the previously parsed end are the same), only the new
+    lines are parsed and appended, so polling a recording that is still being
+    written costs O(new data). Anything else rebuilds the cache.
+    """
+
+    source = Path(source)
+    meta = read_meta(source)
+    if meta is None or meta['schema'] != _schema_key(schema):
+        return build(source, schema)
+    if _is_fresh(source, meta):
+        return meta
+    if _is_appended(source, meta):
+        return append(source, schema, meta)
+    return build(source, schema)
+
+
+def build(source, schema, chunk_bytes=4 << 20):
+    """ Parse *source* chunk by chunk into a fresh cache directory.
+
+    The source is read once; the same pass feeds the hash and the parser. An
+    unterminated last line is parsed as well, but `append` parses it again
+    together with the data written after it, in case the device was still
+    writing it.
+
+    Returns:
+        the metadata written to ``meta.json``
+    """
+
+    source = Path(source)
+    directory = cache_dir(source)
+    # A directory of its own, so builds of the same source in several
+    # processes do not write into each other's files
+    tmp = Path(tempfile.mkdtemp(prefix=f'{source.name}.', suffix='.tmp.cache', dir=source.parent))
+    try:
+        meta = _build_columns(source, schema, tmp, chunk_bytes)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    old = tmp.with_suffix('.old.cache')
+    try:
+        os.rename(directory, old)
+    except FileNotFoundError:
+        old = None
+    try:
+        os.rename(tmp, directory)
+    except OSError:
+        # Another process installed the same cache first, use that one
+        shutil.rmtree(tmp, ignore_errors=True)
+        meta = read_meta(source) or meta
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+    return meta
+
+
+def _build_columns(source, schema, tmp, chunk_bytes):
+    stat = source.stat()
+    digest = hashlib.blake2b()
+    columns = {c.name: open(tmp / (c.name + '.bin'), 'wb') for c in schema.columns}
+    try:
+        with open(source, 'rb') as file:
+            size, offset, offset_rows, rows = _parse_lines(file, columns, schema, chunk_bytes, digest)
+    finally:
+        for column in columns.values():
+            column.close()
+
+    meta = {
+        'version': VERSION,
+        'schema': _schema_key(schema),
+        'size': size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': digest.hexdigest(),
+        'edge_hash': _edge_hash(source, size),
+        'rows': rows,
+        # Byte offset just past the last newline, where an append continues,
+        # and the rows before it
+        'offset': offset,
+        'offset_rows': offset_rows,
+    }
+    _write_meta(tmp, meta)
+    return meta
+
+
+def append(source, schema, meta, chunk_bytes=4 << 20):
+    """ Parse the lines appended to *source* since *meta* and add them.
+
+    Parsing continues at the byte after the last newline seen so far, so a line
+    the device was still writing during the previous pass is read again whole.
+
+    Returns:
+        the updated metadata
+    """
+
+    source = Path(source)
+    directory = cache_dir(source)
+    stat = source.stat()
+
+    columns = {}
+    try:
+        for name, dtype in meta['schema']:
+            # Drop the row of the unterminated line and whatever an interrupted
+            # append may have left behind
+            column = open(directory / (name + '.bin'), 'r+b')
+            columns[name] = column
+            column.truncate(meta['offset_rows'] * np.dtype(dtype).itemsize)
+            column.seek(0, os.SEEK_END)
+
+        with open(source, 'rb') as file:
+            file.seek(meta['offset'])
+            size, offset, offset_rows, rows = _parse_lines(file, columns, schema, chunk_bytes)
+    finally:
+        for column in columns.values():
+            column.close()
+
+    meta.update({
+        'mtime_ns': stat.st_mtime_ns,
+        # The whole-file hash cannot be extended, it is only valid after a build
+        'hash': None,
+        'edge_hash': _edge_hash(source, meta['offset'] + size),
+        'size': meta['offset'] + size,
+        'rows': meta['offset_rows'] + rows,
+        'offset': meta['offset'] + offset,
+        'offset_rows': meta['offset_rows'] + offset_rows,
+    })
+    _write_meta(directory, meta)
+    return meta
+
+
+def _parse_lines(file, columns, schema, chunk_bytes, digest=None):
+    """ Parse *file* from its position on and write the rows to *columns*.
+
+    Returns:
+        (bytes read, bytes up to the last newline, rows before the last
+        newline, all rows including an unterminated last line)
+    """
+
+    size = offset = rows = 0
+    tail = b''
+    while chunk := file.read(chunk_bytes):
+        if digest is not None:
+            digest.update(chunk)
+        size += len(chunk)
+        data = tail + chunk
+        cut = data.rfind(b'\n') + 1
+        tail = data[cut:]
+        if cut:
+            rows += _write_block(columns, parse_bytes(data[:cut], schema))
+            offset += cut
+
+    tail_rows = 0
+    if tail.strip():
+        try:
+            tail_rows = _write_block(columns, parse_bytes(tail, schema))
+        except ValueError:
+            # A line the device is still writing, parsed on the next append
+            pass
+    return size, offset, rows, rows + tail_rows
+
+
+def open_columns(source, meta):
+    directory = cache_dir(source)
+    columns = {}
+    for name, dtype in meta['schema']:
+        if meta['rows'] == 0:
+            columns[name] = np.empty(0, dtype=dtype)
+        else:
+            columns[name] = np.memmap(directory / (name + '.bin'), dtype=dtype,
+                                      mode='r', shape=(meta['rows'],))
+    return columns
+
+
+def read_meta(source):
+    try:
+        with open(cache_dir(source) / META) as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != VERSION:
+        return None
+    return meta
+
+
+def file_hash(path, chunk_bytes=4 << 20):
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as file:
+        while chunk := file.read(chunk_bytes):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_fresh(source, meta):
+    stat = source.stat()
+    if stat.st_size != meta['size']:
+        return False
+    if stat.st_mtime_ns == meta['mtime_ns']:
+        return True
+
+    # Same size but touched (copied, checked out again, ...): compare contents
+    if meta['hash'] is None or file_hash(source) != meta['hash']:
+        return False
+    meta['mtime_ns'] = stat.st_mtime_ns
+    _write_meta(cache_dir(source), meta)
+    return True
+
+
+def _is_appended(source, meta):
+    if source.stat().st_size <= meta['size']:
+        return False
+    return _edge_hash(source, meta['size']) == meta['edge_hash']
+
+
+def _edge_hash(source, size):
+    start = max(0, size - EDGE_BYTES)
+    with open(source, 'rb') as file:
+        file.seek(start)
+        return hashlib.blake2b(file.read(size - start)).hexdigest()
+
+
+def _write_block(columns, block):
+    rows = 0
+    for name, file in columns.items():
+        block[name].tofile(file)
+        rows = len(block[name])
+    return rows
+
+
+def _write_meta(directory, meta):
+    tmp = directory / (META + '.tmp')
+    with open(tmp, 'w') as file:
+        json.dump(meta, file, indent=2)
+    os.replace(tmp, directory / META)
+
+
+def _schema_key(schema):
+    return [[c.name, np.dtype(c.dtype).str] for c in schema.columns]
@@ -0,0 +1,273 @@
+""" Apply fitted calibrations to raw sensor readings.
+
+A calibration turns a raw reading (Ohm, Volt, measured cm) into a physical
+quantity with the inverse of a fitted model. The closed-form inverses are
+evaluated as a short chain of in-place ufuncs over cache-sized chunks, so the
+intermediate results stay in the CPU cache and no temporaries of the size of
+the input are allocated. Models without a usable inverse are tabulated on a
+uniform grid of the raw value, which makes every lookup O(1).
+
+Calibrations are small frozen dataclasses and are saved as JSON:
+
+    >>> save({'ntc1': NtcBeta(0.0155, 3512.8)}, 'calibration.json')
+    >>> calibrations = load('calibration.json')
+    >>> apply_block(calibrations, block)  # e.g. a block of `common.stream.iter_blocks`
+"""
+import json
+from dataclasses import asdict, dataclass, field, fields
+
+import numpy as np
+
+from common.models import KELVIN
+
+VERSION = 1
+# Elements per chunk, a few of these fit in L2 together with the scratch buffer
+CHUNK = 1 << 14
+
+KINDS = {}
+
+
+def register(cls):
+    KINDS[cls.kind] = cls
+    return cls
+
+
+class Calibration:
+    """ Base class, subclasses implement `_apply` on one chunk. """
+
+    kind = None
+
+    def __post_init__(self):
+        # Integer parameters would make the ufuncs compute in the integer
+        # dtype of the raw readings and wrap around
+        for f in fields(self):
+            if f.type in (float, 'float'):
+                object.__setattr__(self, f.name, float(getattr(self, f.name)))
+
+    def __call__(self, values, out=None):
+        """ Convert *values*; pass ``out=values`` to convert a float array in place.
+
+        Returns:
+            *out*, by default a new float32 array (float64 for float64 or wide integer input)
+        """
+
+        values = np.asarray(values)
+        if out is None:
+            out = np.empty(values.shape, dtype=np.result_type(values.dtype, np.float32))
+        flat_in, flat_out = values.reshape(-1), out.reshape(-1)
+        scratch = np.empty(min(CHUNK, flat_out.size), dtype=out.dtype)
+        for start in range(0, flat_out.size, CHUNK):
+            x = flat_in[start:start + CHUNK]
+            self._apply(x, flat_out[start:start + CHUNK], scratch[:x.size])
+        if not np.shares_memory(flat_out, out):
+            # reshape had to copy a non-contiguous out
+            out[...] = flat_out.reshape(out.shape)
+        return out
+
+    def _apply(self, x, out, scratch):
+        raise NotImplementedError
+
+    def to_dict(self):
+        return {'kind': self.kind, **asdict(self)}
+
+    @staticmethod
+    def from_dict(data):
+        data = dict(data)
+        return KINDS[data.pop('kind')](**data)
+
+
+@register
+@dataclass(frozen=True)
+class Linear(Calibration):
+    """ Sensor reading linear in the true value, measured = slope * true + intercept.
+
+    Converts a measured value back to the true one, e.g. the lidar and
+    ultrasonic distances of lab4.
+    """
+
+    slope: float
+    intercept: float
+    kind = 'linear'
+
+    @classmethod
+    def from_polyfit(cls, true, measured):
+        return cls(*map(float, np.polyfit(true, measured, 1)))
+
+    def _apply(self, x, out, scratch):
+        np.subtract(x, self.intercept, out=out)
+        np.multiply(out, 1 / self.slope, out=out)
+
+
+@register
+@dataclass(frozen=True)
+class NtcBeta(Calibration):
+    """ NTC resistance in Ohm to °C, inverse of `common.models.exp_func`. """
+
+    a: float
+    b: float
+    kind = 'ntc_beta'
+
+    def _apply(self, x, out, scratch):
+        # T = b / (ln(R) - ln(a))
+        np.log(x, out=out)
+        np.subtract(out, np.log(self.a), out=out)
+        np.divide(self.b, out, out=out)
+        np.subtract(out, KELVIN, out=out)
+
+
+@register
+@dataclass(frozen=True)
+class SteinhartHart(Calibration):
+    """ NTC resistance in Ohm to °C, see `common.models.steinhart_hart_temperature`. """
+
+    a: float
+    b: float
+    c: float
+    kind = 'steinhart_hart'
+
+    def _apply(self, x, out, scratch):
+        # 1 / T = a + ln(R) * (b + c * ln(R)^2)
+        np.log(x, out=out)
+        np.square(out, out=scratch)
+        np.multiply(scratch, self.c, out=scratch)
+        np.add(scratch, self.b, out=scratch)
+        np.multiply(scratch, out, out=scratch)
+        np.add(scratch, self.a, out=scratch)
+        np.divide(1, scratch, out=out)
+        np.subtract(out, KELVIN, out=out)
+
+
+@register
+@dataclass(frozen=True)
+class KingsLaw(Calibration):
+    """ Hot-wire voltage U_sens in V to mass flow Q_m in kg/s.
+
+    Inverse of `common.models.kings_law` with I = U_sens / shunt. Voltages
+    below the zero-flow current give 0.
+    """
+
+    a: float
+    b: float
+    shunt: float = 10.0
+    kind = 'kings_law'
+
+    def _apply(self, x, out, scratch):
+        # Q_m = ((I^2 - a) / b)^2
+        np.multiply(x, 1 / self.shunt, out=out)
+        np.square(out, out=out)
+        np.subtract(out, self.a, out=out)
+        np.maximum(out, 0, out=out)
+        np.multiply(out, 1 / self.b, out=out)
+        np.square(out, out=out)
+
+
+@register
+@dataclass(frozen=True)
+class Table(Calibration):
+    """ Linear interpolation in values tabulated on a uniform raw grid.
+
+    Raw values outside ``[start, start + step * (len(values) - 1)]`` are
+    clamped to the ends of the table.
+
+    Args:
+        start: raw value of the first entry
+        step: raw distance between entries
+        values: physical value of every entry
+    """
+
+    start: float
+    step: float
+    values: tuple
+    kind = 'table'
+    # (values, slopes) per output dtype
+    _arrays: dict = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        super().__post_init__()
+        values = np.asarray(self.values, dtype=np.float64)
+        object.__setattr__(self, 'values', tuple(values.tolist()))
+        # The slope after the last entry is 0, so the clamped end needs no special case
+        slopes = np.append(np.diff(values), 0)
+        arrays = {np.dtype(dt): (values.astype(dt), slopes.astype(dt)) for dt in (np.float32, np.float64)}
+        object.__setattr__(self, '_arrays', arrays)
+
+    @classmethod
+    def from_samples(cls, raw, physical, size=4096):
+        """ Tabulate a monotonic relation given by samples, e.g. a measured characteristic. """
+
+        raw = np.asarray(raw, dtype=np.float64)
+        order = np.argsort(raw)
+        grid = np.linspace(raw[order[0]], raw[order[-1]], size)
+        values = np.interp(grid, raw[order], np.asarray(physical, dtype=np.float64)[order])
+        return cls(float(grid[0]), float(grid[1] - grid[0]), values)
+
+    @classmethod
+    def invert(cls, func, low, high, size=4096, oversample=16):
+        """ Tabulate the inverse of a monotonic model ``raw = func(physical)`` on [low, high].
+
+        Example:
+            >>> Table.invert(lambda t: voltage_divider(t, r1, r2), -40, 125)  # V -> °C
+        """
+
+        physical = np.linspace(low, high, size * oversample)
+        return cls.from_samples(func(physical), physical, size)
+
+    def to_dict(self):
+        return {'kind': self.kind, 'start': self.start, 'step': self.step, 'values': list(self.values)}
+
+    def _apply(self, x, out, scratch):
+        if out.dtype not in self._arrays:
+            values, slopes = self._arrays[np.dtype(np.float64)]
+            self._arrays[out.dtype] = values.astype(out.dtype), slopes.astype(out.dtype)
+        values, slopes = self._arrays[out.dtype]
+        np.subtract(x, self.start, out=out)
+        np.multiply(out, 1 / self.step, out=out)
+        np.clip(out, 0, len(values) - 1, out=out)
+        index = out.astype(np.intp)
+        # out becomes the fraction between index and index + 1
+        np.subtract(out, index, out=out)
+        np.take(slopes, index, out=scratch, mode='clip')
+        np.multiply(out, scratch, out=out)
+        np.take(values, index, out=scratch, mode='clip')
+        np.add(out, scratch, out=out)
+
+
+def apply_block(calibrations, block):
+    """ Calibrate the columns of *block* that have a calibration.
+
+    Float columns are converted in place, integer columns (e.g. the uint16
+    distances of `common.schema.RECORDING`) are replaced by float32 arrays.
+
+    Returns:
+        *block*
+    """
+
+    for name, calibration in calibrations.items():
+        if name not in block:
+            continue
+        values = block[name]
+        in_place = values.dtype.kind == 'f' and values.flags.writeable
+        block[name] = calibration(values, out=values if in_place else None)
+    return block
+
+
+def save(calibrations, path):
+    """ Write a dict of named calibrations to a JSON file. """
+
+    data = {'version': VERSION, 'calibrations': {name: c.to_dict() for name, c in calibrations.items()}}
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=2)
+
+
+def load(path):
+    """ Read calibrations written by `save`.
+
+    Returns:
+        dict mapping names to `Calibration` objects
+    """
+
+    with open(path) as file:
+        data = json.load(file)
+    if data.get('version') != VERSION:
+        raise ValueError(f"Unsupported calibration file version {data.get('version')}")
+    return {name: Calibration.from_dict(c) for name, c in data['calibrations'].items()}
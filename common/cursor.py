@@ -0,0 +1,347 @@
+from bisect import bisect_left
+
+import numpy as np
+from matplotlib.widgets import Cursor
+
+
+class NearestIndex:
+    """
+    Nearest-sample lookup in sorted data through a uniform grid.
+
+    The data range is divided into as many equally sized cells as there are
+    samples and the first sample of every cell is stored. A lookup computes
+    the cell directly from the position and only bisects inside that cell,
+    which takes constant time for roughly uniformly sampled data such as
+    recording timestamps.
+
+    Parameters
+    ----------
+    data : array-like
+        Sorted 1-D data.
+    """
+
+    def __init__(self, data):
+        self.data = np.ascontiguousarray(data, dtype=np.float64)
+        n = len(self.data)
+        self.low = self.data[0]
+        span = self.data[-1] - self.low
+        self.scale = n / span if span > 0 else 0.0
+        # starts[k] is the first sample in cell k, starts[n] closes the last cell
+        edges = self.low + np.arange(n) / self.scale if span > 0 else np.full(n, self.low)
+        self.starts = np.append(np.searchsorted(self.data, edges), n)
+
+    def nearest(self, pos):
+        """ Return the index of the sample closest to *pos*. """
+
+        n = len(self.data)
+        cell = min(max(int((pos - self.low) * self.scale), 0), n - 1)
+        # First sample >= pos, it lies in this cell or is the next cell's start
+        i = bisect_left(self.data, pos, int(self.starts[cell]), int(self.starts[cell + 1]))
+        if i == 0:
+            return 0
+        if i == n or pos - self.data[i - 1] <= self.data[i] - pos:
+            return i - 1
+        return i
+
+
+class AnnotatedCursor(Cursor):
+    """
+    A crosshair cursor like `~matplotlib.widgets.Cursor` with a text showing \
+    the current coordinates.
+
+    For the cursor to remain responsive you must keep a reference to it.
+    The data of the axis specified as *dataaxis* must be in ascending
+    order. Otherwise, the `NearestIndex` lookup returns wrong points.
+    You can satisfy the requirement by sorting the data you plot.
+    Usually the data is already sorted (if it was created e.g. using
+    `numpy.linspace`), but e.g. scatter plots might cause this problem.
+    The cursor sticks to the first plotted line and snaps to its nearest
+    sample.
+
+    The line data is copied into contiguous float arrays and indexed once.
+    Both are only rebuilt when a line gets new data through ``set_data``
+    (in-place modifications of the plotted arrays are not detected). Lines
+    sharing the same data along *dataaxis* share a single index and lookup.
+
+    Parameters
+    ----------
+    line : `matplotlib.lines.Line2D` or list of them
+        The plot lines from which the data coordinates are displayed.
+        Anything providing ``get_xdata`` and ``get_ydata`` works, e.g.
+        `common.lod.DecimatedLine`.
+
+    numberformat : `python format string <https://docs.python.org/3/\
+    library/string.html#formatstrings>`_, optional, default: "{0:.4g};{1:.4g}"
+        The displayed text is created by calling *format()* on this string
+        with the coordinates returned by `set_position`, which are the
+        two coordinates for a single line.
+
+    offset : (float, float) default: (5, 5)
+        The offset in display (pixel) coordinates of the text position
+        relative to the cross-hair.
+
+    dataaxis : {"x", "y"}, optional, default: "x"
+        If "x" is specified, the vertical cursor line sticks to the mouse
+        pointer. The horizontal cursor line sticks to *line*
+        at that x value. The text shows the data coordinates of *line*
+        at the pointed x value. If you specify "y", it works in the opposite
+        manner. But: For the "y" value, where the mouse points to, there might
+        be multiple matching x values, if the plotted function is not biunique.
+        Cursor and text coordinate will always refer to only one x value.
+        So if you use the parameter value "y", ensure that your function is
+        biunique.
+
+    Other Parameters
+    ----------------
+    textprops : `matplotlib.text` properties as dictionary
+        Specifies the appearance of the rendered text object.
+
+    **cursorargs : `matplotlib.widgets.Cursor` properties
+        Arguments passed to the internal `~matplotlib.widgets.Cursor` instance.
+        The `matplotlib.axes.Axes` argument is mandatory! The parameter
+        *useblit* can be set to *True* in order to achieve faster rendering.
+
+    """
+
+    def __init__(self, line, numberformat="{0:.4g};{1:.4g}", offset=(5, 5),
+                 dataaxis='x', textprops=None, **cursorargs):
+        if textprops is None:
+            textprops = {}
+        # The line objects, for which the coordinates are displayed
+        self.lines = list(line) if isinstance(line, (list, tuple)) else [line]
+        self.line = self.lines[0]
+        # The format string, on which .format() is called for creating the text
+        self.numberformat = numberformat
+        # Text position offset
+        self.offset = np.array(offset)
+        # The axis in which the cursor position is looked up
+        self.dataaxis = dataaxis
+
+        # First call baseclass constructor.
+        # Draws cursor and remembers background for blitting.
+        # Saves ax as class attribute.
+        super().__init__(**cursorargs)
+
+        # Cached line data and lookup indices, see _refresh().
+        self._sources = None
+        self._groups = []
+
+        # Default value for position of text.
+        self.set_position(self.line.get_xdata()[0], self.line.get_ydata()[0])
+        # Create invisible animated text
+        self.text = self.ax.text(
+            self.ax.get_xbound()[0],
+            self.ax.get_ybound()[0],
+            "0, 0",
+            animated=bool(self.useblit),
+            visible=False, **textprops)
+        # The position at which the cursor was last drawn
+        self.lastdrawnplotpoint = None
+
+    def onmove(self, event):
+        """
+        Overridden draw callback for cursor. Called when moving the mouse.
+        """
+
+        # Leave method under the same conditions as in overridden method
+        if self.ignore(event):
+            self.lastdrawnplotpoint = None
+            return
+        if not self.canvas.widgetlock.available(self):
+            self.lastdrawnplotpoint = None
+            return
+
+        # If the mouse left drawable area, we now make the text invisible.
+        # Baseclass will redraw complete canvas after, which makes both text
+        # and cursor disappear.
+        if event.inaxes != self.ax:
+            self.lastdrawnplotpoint = None
+            self.text.set_visible(False)
+            super().onmove(event)
+            return
+
+        # Get the coordinates, which should be displayed as text,
+        # if the event coordinates are valid.
+        plotpoint = None
+        if event.xdata is not None and event.ydata is not None:
+            # Get plot point related to current x position.
+            # These coordinates are displayed in text.
+            plotpoint = self.set_position(event.xdata, event.ydata)
+            # Modify event, such that the cursor is displayed on the
+            # plotted line, not at the mouse pointer,
+            # if the returned plot point is valid
+            if plotpoint is not None:
+                event.xdata = plotpoint[0]
+                event.ydata = plotpoint[-1] if self.dataaxis == 'y' else plotpoint[1]
+
+        # If the plotpoint is given, compare to last drawn plotpoint and
+        # return if they are the same.
+        # Skip even the call of the base class, because this would restore the
+        # background, draw the cursor lines and would leave us the job to
+        # re-draw the text.
+        if plotpoint is not None and plotpoint == self.lastdrawnplotpoint:
+            return
+
+        # Baseclass redraws canvas and cursor. Due to blitting,
+        # the added text is removed in this call, because the
+        # background is redrawn.
+        super().onmove(event)
+
+        # Check if the display of text is still necessary.
+        # If not, just return.
+        # This behaviour is also cloned from the base class.
+        if not self.get_active() or not self.visible:
+            return
+
+        # Draw the widget, if event coordinates are valid.
+        if plotpoint is not None:
+            # Update position and displayed text.
+            # Position: Where the event occurred.
+            # Text: Determined by set_position() method earlier
+            # Position is transformed to pixel coordinates,
+            # an offset is added there and this is transformed back.
+            temp = [event.xdata, event.ydata]
+            temp = self.ax.transData.transform(temp)
+            temp = temp + self.offset
+            temp = self.ax.transData.inverted().transform(temp)
+            self.text.set_position(temp)
+            self.text.set_text(self.numberformat.format(*plotpoint))
+            self.text.set_visible(self.visible)
+
+            # Tell base class, that we have drawn something.
+            # Baseclass needs to know, that it needs to restore a clean
+            # background, if the cursor leaves our figure context.
+            self.needclear = True
+
+            # Remember the recently drawn cursor position, so events for the
+            # same position (mouse moves slightly between two plot points)
+            # can be skipped
+            self.lastdrawnplotpoint = plotpoint
+        # otherwise, make text invisible
+        else:
+            self.text.set_visible(False)
+
+        # Draw changes. Cannot use _update method of baseclass,
+        # because it would first restore the background, which
+        # is done already and is not necessary.
+        if self.useblit:
+            self.ax.draw_artist(self.text)
+            self.canvas.blit(self.ax.bbox)
+        else:
+            # If blitting is deactivated, the overridden _update call made
+            # by the base class immediately returned.
+            # We still have to draw the changes.
+            self.canvas.draw_idle()
+
+    def set_position(self, xpos, ypos):
+        """
+        Finds the coordinates, which have to be shown in text.
+
+        The behaviour depends on the *dataaxis* attribute. Function looks
+        up the nearest plot coordinate for the given mouse position.
+
+        Parameters
+        ----------
+        xpos : float
+            The current x position of the cursor in data coordinates.
+            Important if *dataaxis* is set to 'x'.
+        ypos : float
+            The current y position of the cursor in data coordinates.
+            Important if *dataaxis* is set to 'y'.
+
+        Returns
+        -------
+        ret : {tuple, None}
+            The coordinates which should be displayed. For *dataaxis* 'x'
+            this is the x value followed by the y value of every line, for
+            'y' the x value of every line followed by the y value.
+            *None* is the fallback value.
+        """
+
+        # The dataaxis attribute decides, in which axis we look up which cursor
+        # coordinate.
+        if self.dataaxis == 'x':
+            pos = xpos
+            lim = self.ax.get_xlim()
+        elif self.dataaxis == 'y':
+            pos = ypos
+            lim = self.ax.get_ylim()
+        else:
+            raise ValueError(f"The data axis specifier {self.dataaxis} should "
+                             f"be 'x' or 'y'")
+
+        # If position is valid and in valid plot data range.
+        if pos is None or not lim[0] <= pos <= lim[-1]:
+            # Return none if there is no good related point for this position.
+            return None
+
+        self._refresh()
+        values = [None] * len(self.lines)
+        key = None
+        for index, members in self._groups:
+            if index is None:
+                continue
+            i = index.nearest(pos)
+            if key is None:
+                key = index.data[i]
+            for member in members:
+                values[member] = self._other[member][i]
+
+        if key is None:
+            return None
+        if self.dataaxis == 'x':
+            return (key, *values)
+        return (*values, key)
+
+    def _refresh(self):
+        """
+        Rebuild the cached arrays and indices if any line got new data.
+        """
+
+        sources = [(line.get_xdata(), line.get_ydata()) for line in self.lines]
+        if self._sources is not None and all(
+                x is cx and y is cy for (x, y), (cx, cy) in zip(sources, self._sources)):
+            return
+        self._sources = sources
+
+        axis = 0 if self.dataaxis == 'x' else 1
+        self._other = []
+        self._groups = []
+        for member, data in enumerate(sources):
+            key = np.ascontiguousarray(data[axis], dtype=np.float64)
+            self._other.append(np.ascontiguousarray(data[1 - axis], dtype=np.float64))
+            for group in self._groups:
+                if group[2] is key or np.array_equal(group[2], key):
+                    group[1].append(member)
+                    break
+            else:
+                index = NearestIndex(key) if len(key) else None
+                self._groups.append((index, [member], key))
+        self._groups = [(index, members) for index, members, _ in self._groups]
+
+    def clear(self, event):
+        """
+        Overridden clear callback for cursor, called before drawing the figure.
+        """
+
+        # The base class saves the clean background for blitting.
+        # Text and cursor are invisible,
+        # until the first mouse move event occurs.
+        super().clear(event)
+        if self.ignore(event):
+            return
+        self.text.set_visible(False)
+
+    def _update(self):
+        """
+        Overridden method for either blitting or drawing the widget canvas.
+
+        Passes call to base class if blitting is activated, only.
+        In other cases, one draw_idle call is enough, which is placed
+        explicitly in this class (see *onmove()*).
+        In that case, `~matplotlib.widgets.Cursor` is not supposed to draw
+        something using this method.
+        """
+
+        if self.useblit:
+            super()._update()
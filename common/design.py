@@ -0,0 +1,94 @@
+""" Search standard resistor values for the NTC linearization divider.
+
+Every (R1, R2) pair of an E series is evaluated against every NTC parameter
+set at once: the parallel resistance of R2 and the NTC does not depend on R1,
+so it is computed once per R2 and the outputs for a chunk of R1 values are a
+single broadcast over (R1, R2, NTC, temperature). Only the best candidates of
+each chunk are kept.
+"""
+import numpy as np
+
+from common.models import exp_func
+
+E12 = (1.0, 1.2, 1.5, 1.8, 2.2, 2.7, 3.3, 3.9, 4.7, 5.6, 6.8, 8.2)
+E24 = (1.0, 1.1, 1.2, 1.3, 1.5, 1.6, 1.8, 2.0, 2.2, 2.4, 2.7, 3.0,
+       3.3, 3.6, 3.9, 4.3, 4.7, 5.1, 5.6, 6.2, 6.8, 7.5, 8.2, 9.1)
+# Unlike E12/E24, the E48 and finer series follow the rounded geometric formula
+E96 = tuple(np.round(10 ** (np.arange(96) / 96), 2).tolist())
+SERIES = {'E12': E12, 'E24': E24, 'E96': E96}
+
+
+def series_values(name, decades=(10, 100, 1000, 10000, 100000)):
+    """ Values of the E series *name* in Ohm, 10 Ohm to 1 MOhm by default. """
+
+    return np.round(np.outer(decades, SERIES[name]).ravel(), 2)
+
+
+def search(r1, r2, ntc_params, ideal, t=np.linspace(-40, 125, 166), vin=5, top=10, by='max',
+           worst_case=False, chunk_bytes=64 << 20):
+    """ Rank divider designs by their deviation from the ideal characteristic.
+
+    Args:
+        r1: candidate values of R1 in Ohm, e.g. ``series_values('E24')``
+        r2: candidate values of R2 in Ohm
+        ntc_params: (sets, 2) `exp_func` parameters a and b of the NTCs
+        ideal: target output voltage, a function of the temperature or an array like *t*
+        t: temperatures in °C the error is evaluated at
+        vin: supply voltage in V
+        top: number of candidates returned
+        by: 'max' or 'rms', the error the candidates are ranked by
+        worst_case: rank each pair by its worst NTC set, so the design suits all of them
+        chunk_bytes: memory used for the outputs of one chunk of R1 values
+
+    Returns:
+        dict with the arrays 'r1', 'r2', 'ntc' (index into *ntc_params*, the
+        worst set if *worst_case*), 'max_error' and 'rms_error' in V, best first
+    """
+
+    if by not in ('max', 'rms'):
+        raise ValueError(f"Unknown error measure {by}")
+    r1 = np.asarray(r1, dtype=np.float64)
+    r2 = np.asarray(r2, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    target = ideal(t) if callable(ideal) else np.asarray(ideal, dtype=np.float64)
+    ntc = np.atleast_2d(np.asarray(ntc_params, dtype=np.float64))
+
+    r_ntc = exp_func(t, ntc[:, :1], ntc[:, 1:])
+    # (R2, NTC, temperature)
+    parallel = r2[:, None, None] * r_ntc / (r2[:, None, None] + r_ntc)
+
+    rows = max(1, chunk_bytes // parallel.nbytes)
+    best = None
+    for start in range(0, len(r1), rows):
+        chunk = r1[start:start + rows]
+        error = parallel / (chunk[:, None, None, None] + parallel)
+        error *= vin
+        error -= target
+        np.abs(error, out=error)
+        max_error = error.max(axis=-1)
+        np.square(error, out=error)
+        rms_error = np.sqrt(error.mean(axis=-1))
+
+        # (R1, R2, NTC)
+        if worst_case:
+            ntc_index = np.argmax(max_error if by == 'max' else rms_error, axis=-1)[..., None]
+            max_error = np.take_along_axis(max_error, ntc_index, axis=-1)
+            rms_error = np.take_along_axis(rms_error, ntc_index, axis=-1)
+        else:
+            ntc_index = np.broadcast_to(np.arange(len(ntc)), max_error.shape)
+
+        score = (max_error if by == 'max' else rms_error).ravel()
+        keep = np.argpartition(score, top - 1)[:top] if score.size > top else np.arange(score.size)
+        i1, i2, _ = np.unravel_index(keep, max_error.shape)
+        found = {
+            'r1': chunk[i1],
+            'r2': r2[i2],
+            'ntc': ntc_index.ravel()[keep],
+            'max_error': max_error.ravel()[keep],
+            'rms_error': rms_error.ravel()[keep],
+        }
+        if best is not None:
+            found = {name: np.concatenate((best[name], found[name])) for name in found}
+        order = np.argsort(found[f'{by}_error'], kind='stable')[:top]
+        best = {name: values[order] for name, values in found.items()}
+    return best
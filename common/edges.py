@@ -0,0 +1,55 @@
+""" Find the passes of a target through a distance sensor's beam.
+
+While the target is in the beam the sensor reads a shorter distance than the
+background. Samples are classified against a threshold just below the
+background level, so a pass starts at the first clear departure from the
+background, like a reading taken with the cursor. The resulting runs are
+cleaned up with arithmetic on the edge indices instead of a loop over
+samples: gaps shorter than *min_gap* (dropouts at the rim of the beam) are
+bridged and passes shorter than *min_duration* (spikes) are dropped.
+"""
+import numpy as np
+
+
+def find_passes(t, values, level=0.1, threshold=None, min_gap=0.5, min_duration=0.5):
+    """ Entry and exit times of every pass of a target.
+
+    Args:
+        t: sample times in s
+        values: measured distance
+        level: threshold as the fraction of the way from the background
+            (median, the target is out of the beam most of the time) to the
+            target level (5th percentile)
+        threshold: distance below which the target is in the beam, overrides *level*
+        min_gap: shorter gaps in s between two passes are bridged
+        min_duration: shorter passes in s are dropped
+
+    Returns:
+        (entries, exits) arrays in s; the exit is the first sample without the target
+    """
+
+    t = np.asarray(t, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if threshold is None:
+        background = np.median(values)
+        target = np.percentile(values, 5)
+        if background - target < 1:
+            return np.empty(0), np.empty(0)
+        threshold = background - level * (background - target)
+
+    present = np.concatenate(([False], values < threshold, [False]))
+    edges = np.flatnonzero(np.diff(present.view(np.int8)))
+    starts, ends = edges[::2], edges[1::2]
+    if starts.size == 0:
+        return np.empty(0), np.empty(0)
+    # A pass still running at the end of the recording exits at the last sample
+    ends = np.minimum(ends, len(t) - 1)
+
+    gap = t[starts[1:]] - t[ends[:-1]]
+    keep = gap >= min_gap
+    starts = starts[np.concatenate(([True], keep))]
+    ends = ends[np.concatenate((keep, [True]))]
+
+    entries, exits = t[starts], t[ends]
+    long_enough = exits - entries >= min_duration
+    return entries[long_enough], exits[long_enough]
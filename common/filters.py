@@ -0,0 +1,133 @@
+""" Spike and dropout filters for streamed sensor channels.
+
+All filters work on the window ending at every sample and carry what they
+need of a block (the last ``window - 1`` samples or the last output) into the
+next one, so filtering a recording block by block gives the same result as
+one `update` with the whole array.
+
+The running median selects the middle of every window with ``np.partition``
+on strided window views, a few thousand windows at a time. That is O(w) per
+sample instead of the O(log w) of a sorted sliding window, but it runs in one
+vectorized call rather than a Python step per sample, which is much faster
+for the windows of a few to a few dozen samples used on these sensors.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Windows selected at a time, bounds the copy np.partition makes
+CHUNK = 1 << 14
+# Standard deviations per median absolute deviation of a normal distribution
+MAD_SCALE = 1.4826
+
+
+class RunningMedian:
+    """ Median over the last *window* samples of a stream. """
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError(f"Window of {window} samples is empty")
+        self.window = window
+        self._tail = np.empty(0)
+
+    def update(self, values):
+        """ Medians of the windows ending at every sample of *values*.
+
+        Returns:
+            array like *values*, NaN until the window is full
+        """
+
+        median, _ = self._update(values, spread=False)
+        return median
+
+    def _update(self, values, spread):
+        values = np.asarray(values, dtype=np.float64)
+        median = np.full(values.size, np.nan)
+        mad = np.full(values.size, np.nan) if spread else None
+        series = np.concatenate((self._tail, values))
+        if series.size >= self.window:
+            windows = sliding_window_view(series, self.window)
+            offset = values.size - len(windows)
+            for start in range(0, len(windows), CHUNK):
+                chunk = windows[start:start + CHUNK]
+                rows = slice(offset + start, offset + start + len(chunk))
+                median[rows] = _median(chunk)
+                if spread:
+                    mad[rows] = _median(np.abs(chunk - median[rows, None]))
+        self._tail = series[max(series.size - (self.window - 1), 0):]
+        return median, mad
+
+
+class Hampel:
+    """ Replace samples far from the median of their window by the median.
+
+    A sample is an outlier when it differs from the median of the window
+    ending at it by more than *threshold* robust standard deviations
+    (`MAD_SCALE` times the median absolute deviation). On quantized signals
+    that often hold a level exactly the deviation is 0, so it is raised to
+    *min_sigma*, e.g. the resolution of the sensor.
+
+    Args:
+        window: samples in the window, odd
+        threshold: robust standard deviations of an outlier
+        min_sigma: smallest standard deviation, in the unit of the values
+    """
+
+    def __init__(self, window=7, threshold=3.0, min_sigma=0.0):
+        self.median = RunningMedian(window)
+        self.threshold = threshold
+        self.min_sigma = min_sigma
+
+    def update(self, values):
+        """ Filter the next block.
+
+        Returns:
+            (filtered, outliers): the values with the outliers replaced and
+            the boolean outlier mask; samples before the window is full are
+            passed through
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+        median, mad = self.median._update(values, spread=True)
+        sigma = np.maximum(MAD_SCALE * mad, self.min_sigma)
+        with np.errstate(invalid='ignore'):
+            outliers = np.abs(values - median) > self.threshold * sigma
+        return np.where(outliers, median, values), outliers
+
+
+class ExponentialSmoother:
+    """ First-order low-pass ``y[n] = y[n-1] + alpha * (x[n] - y[n-1])``.
+
+    Starts at the first sample and carries the last output between blocks.
+    Needs SciPy for the recursion.
+
+    Args:
+        alpha: weight of the new sample, between 0 and 1
+    """
+
+    def __init__(self, alpha):
+        if not 0 < alpha <= 1:
+            raise ValueError(f"alpha must be in (0, 1], got {alpha}")
+        self.alpha = alpha
+        self._last = None
+
+    def update(self, values):
+        from scipy.signal import lfilter
+
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return values
+        if self._last is None:
+            self._last = values[0]
+        smoothed, _ = lfilter([self.alpha], [1, self.alpha - 1], values, zi=[(1 - self.alpha) * self._last])
+        self._last = smoothed[-1]
+        return smoothed
+
+
+def _median(windows):
+    """ Median of every row, also for even windows. """
+
+    w = windows.shape[1]
+    if w % 2:
+        return np.partition(windows, w // 2, axis=1)[:, w // 2]
+    middle = np.partition(windows, (w // 2 - 1, w // 2), axis=1)
+    return (middle[:, w // 2 - 1] + middle[:, w // 2]) / 2
@@ -0,0 +1,179 @@
+import functools
+import hashlib
+import inspect
+from pathlib import Path, PurePath
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class UnhashableState(TypeError):
+    """ A function captures state that cannot be hashed reproducibly. """
+
+
+def code_hash(func, digest=None):
+    """ Hash the source of *func* and of the repository code it calls.
+
+    Functions and classes referenced by global name are followed recursively
+    as long as they are defined inside this repository, so editing a helper
+    (e.g. a model used inside a fitted function, or the styling of a figure
+    split across several functions) changes the hash of everything using it.
+    Referenced module constants (numbers, strings, tuples of them and arrays,
+    e.g. `common.models.KELVIN`) are hashed by value.
+
+    The state a function carries is hashed too: closure cells, default
+    arguments, the instance of a bound method and the arguments of a
+    `functools.partial`, so two closures of the same source with different
+    captured values get different hashes.
+
+    Returns:
+        hex digest
+
+    Raises:
+        UnhashableState: if that state holds objects other than plain values,
+            paths, arrays, functions, classes and instances made of those
+    """
+
+    digest = digest or hashlib.sha256()
+    _hash_object(func, digest, set())
+    return digest.hexdigest()
+
+
+def data_hash(*values, digest=None):
+    """ Hash arrays and plain values (numbers, strings, nested lists/tuples/dicts).
+
+    Functions are hashed by their code, see `code_hash`.
+    """
+
+    digest = digest or hashlib.sha256()
+    for value in values:
+        _hash_value(value, digest)
+    return digest.hexdigest()
+
+
+def _hash_value(value, digest):
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        digest.update(f'array{value.dtype.str}{value.shape}'.encode())
+        digest.update(value.data)
+    elif isinstance(value, dict):
+        digest.update(b'dict')
+        for key in sorted(value):
+            _hash_value(key, digest)
+            _hash_value(value[key], digest)
+    elif isinstance(value, (list, tuple)):
+        digest.update(f'{type(value).__name__}{len(value)}'.encode())
+        for item in value:
+            _hash_value(item, digest)
+    elif inspect.isfunction(value) or inspect.isclass(value):
+        _hash_object(value, digest, set())
+    else:
+        digest.update(repr(value).encode())
+
+
+def _is_local(obj):
+    try:
+        source = inspect.getsourcefile(obj)
+    except TypeError:
+        return False
+    return source is not None and Path(source).resolve().is_relative_to(ROOT)
+
+
+def _hash_object(obj, digest, seen):
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+
+    if inspect.ismethod(obj):
+        digest.update(b'method')
+        _hash_object(obj.__func__, digest, seen)
+        _hash_state(obj.__self__, digest, seen)
+        return
+    if isinstance(obj, functools.partial):
+        digest.update(b'partial')
+        _hash_object(obj.func, digest, seen)
+        _hash_state(obj.args, digest, seen)
+        _hash_state(obj.keywords, digest, seen)
+        return
+
+    try:
+        digest.update(inspect.getsource(obj).encode())
+    except (OSError, TypeError):
+        digest.update(getattr(obj, '__qualname__', repr(obj)).encode())
+
+    if inspect.isclass(obj):
+        members = [m for m in vars(obj).values() if inspect.isfunction(m)]
+        for member in members:
+            _hash_referenced(member, digest, seen)
+    elif inspect.isfunction(obj):
+        _hash_referenced(obj, digest, seen)
+        for cell in obj.__closure__ or ():
+            try:
+                contents = cell.cell_contents
+            except ValueError:
+                digest.update(b'empty cell')
+                continue
+            _hash_state(contents, digest, seen)
+        _hash_state(obj.__defaults__, digest, seen)
+        _hash_state(obj.__kwdefaults__, digest, seen)
+
+
+def _hash_state(value, digest, seen):
+    """ Hash a value a function captured, by value down to plain data. """
+
+    if value is None or _is_constant(value):
+        _hash_value(value, digest)
+    elif isinstance(value, (PurePath, np.dtype, range, slice)):
+        digest.update(repr(value).encode())
+    elif isinstance(value, (set, frozenset)):
+        digest.update(f'{type(value).__name__}{len(value)}'.encode())
+        for item in sorted(value, key=repr):
+            _hash_state(item, digest, seen)
+    elif isinstance(value, (list, tuple)):
+        digest.update(f'{type(value).__name__}{len(value)}'.encode())
+        for item in value:
+            _hash_state(item, digest, seen)
+    elif isinstance(value, dict):
+        digest.update(b'dict')
+        for key in sorted(value, key=repr):
+            _hash_value(key, digest)
+            _hash_state(value[key], digest, seen)
+    elif callable(value) and (inspect.isroutine(value) or inspect.isclass(value)
+                              or isinstance(value, functools.partial)):
+        _hash_object(value, digest, seen)
+    elif inspect.ismodule(value):
+        digest.update(value.__name__.encode())
+    elif hasattr(value, '__dict__') and id(value) not in seen:
+        seen.add(id(value))
+        _hash_object(type(value), digest, seen)
+        _hash_state(vars(value), digest, seen)
+    else:
+        raise UnhashableState(f"Cannot hash captured {type(value).__name__} {value!r:.60}")
+
+
+def _hash_referenced(func, digest, seen):
+    names = set()
+    codes = [func.__code__]
+    while codes:
+        code = codes.pop()
+        names.update(code.co_names)
+        codes.extend(c for c in code.co_consts if inspect.iscode(c))
+
+    for name in sorted(names):
+        value = func.__globals__.get(name)
+        if (inspect.isfunction(value) or inspect.isclass(value)) and _is_local(value):
+            _hash_object(value, digest, seen)
+        elif _is_constant(value):
+            digest.update(name.encode())
+            _hash_value(value, digest)
+
+
+def _is_constant(value):
+    """ Plain values whose repr or bytes are stable between runs. """
+
+    if isinstance(value, (bool, int, float, complex, str, bytes, np.generic, np.ndarray)):
+        return not (isinstance(value, np.ndarray) and value.dtype.hasobject)
+    if isinstance(value, tuple):
+        return all(_is_constant(item) for item in value)
+    return False
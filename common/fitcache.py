@@ -0,0 +1,92 @@
+""" Memoized `scipy.optimize.curve_fit`.
+
+Results are keyed on a hash of the model function (its source and the
+repository code it calls), the input arrays, the initial guess, the bounds and
+any other curve_fit arguments. They are kept in memory for the session and in
+``.fit_cache`` at the repository root, where the least recently used entries
+are removed once there are more than *max_entries*. A model function that
+captures state the key cannot hash (see `common.fingerprint.code_hash`) is
+fitted every time.
+"""
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from common.fingerprint import ROOT, UnhashableState, code_hash, data_hash
+
+CACHE_DIR = Path(os.environ.get('FIT_CACHE_DIR', ROOT / '.fit_cache'))
+MAX_ENTRIES = 256
+
+_memory = OrderedDict()
+
+
+def fit_key(f, xdata, ydata, p0=None, bounds=(-np.inf, np.inf), **kwargs):
+    digest = hashlib.sha256()
+    code_hash(f, digest=digest)
+    data_hash(np.asarray(xdata), np.asarray(ydata), p0, bounds, kwargs, digest=digest)
+    return digest.hexdigest()
+
+
+def cached_curve_fit(f, xdata, ydata, p0=None, bounds=(-np.inf, np.inf),
+                     cache_dir=CACHE_DIR, max_entries=MAX_ENTRIES, **kwargs):
+    """ Drop-in replacement for `scipy.optimize.curve_fit` returning (popt, pcov).
+
+    Args:
+        f, xdata, ydata, p0, bounds, **kwargs: as for curve_fit
+        cache_dir: directory of the persistent cache, None keeps it in memory only
+        max_entries: number of results kept in memory and on disk
+    """
+
+    try:
+        key = fit_key(f, xdata, ydata, p0, bounds, **kwargs)
+    except UnhashableState:
+        from scipy.optimize import curve_fit
+
+        popt, pcov = curve_fit(f, xdata, ydata, p0=p0, bounds=bounds, **kwargs)[:2]
+        return popt, pcov
+
+    if key in _memory:
+        _memory.move_to_end(key)
+        popt, pcov = _memory[key]
+        return popt.copy(), pcov.copy()
+
+    path = Path(cache_dir) / f'{key}.npz' if cache_dir is not None else None
+    result = _load(path) if path is not None else None
+    if result is None:
+        from scipy.optimize import curve_fit
+
+        result = curve_fit(f, xdata, ydata, p0=p0, bounds=bounds, **kwargs)[:2]
+        if path is not None:
+            _store(path, result, max_entries)
+
+    _memory[key] = result
+    while len(_memory) > max_entries:
+        _memory.popitem(last=False)
+    popt, pcov = result
+    return popt.copy(), pcov.copy()
+
+
+def _load(path):
+    try:
+        with np.load(path) as data:
+            result = data['popt'], data['pcov']
+    except (OSError, KeyError, ValueError):
+        return None
+    # Mark as recently used for the eviction
+    os.utime(path)
+    return result
+
+
+def _store(path, result, max_entries):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'{path.stem}.{os.getpid()}.tmp')
+    with open(tmp, 'wb') as file:
+        np.savez(file, popt=result[0], pcov=result[1])
+    os.replace(tmp, path)
+
+    entries = sorted(path.parent.glob('*.npz'), key=lambda p: p.stat().st_mtime_ns)
+    for old in entries[:-max_entries]:
+        old.unlink(missing_ok=True)
@@ -0,0 +1,115 @@
+""" Constant-velocity Kalman filter and RTS smoother over a batch of tracks.
+
+The state of a track is its position and velocity; every sensor measures
+the position with its own noise variance. All arrays carry a batch dimension,
+so many recordings or targets are filtered together: the loop runs over the
+time steps only, each step updates all tracks with a few array operations.
+Sensors are applied one after another as scalar updates, which needs no
+matrix inversion and lets a NaN measurement (a dropout, or the padding of a
+shorter recording) simply skip its update.
+"""
+import numpy as np
+
+# Initial variance of position and velocity when none is given
+INITIAL_VARIANCE = 1e6
+
+
+def transition(dt, q):
+    """ State transition and process noise of a constant-velocity model.
+
+    Args:
+        dt: time step
+        q: spectral density of the white acceleration, e.g. in cm²/s³
+
+    Returns:
+        (F, Q), both 2x2
+    """
+
+    f = np.array([[1.0, dt], [0.0, 1.0]])
+    noise = q * np.array([[dt ** 3 / 3, dt ** 2 / 2], [dt ** 2 / 2, dt]])
+    return f, noise
+
+
+def kalman_filter(z, r, dt, q, x0=None, p0=None):
+    """ Filter a batch of tracks measured by several position sensors.
+
+    Args:
+        z: (tracks, steps, sensors) positions, NaN where missing
+        r: (sensors,) or (tracks, sensors) measurement noise variances
+        dt: time step
+        q: process noise density, see `transition`
+        x0: (tracks, 2) initial position and velocity, zero by default
+        p0: (tracks, 2, 2) or (2, 2) initial covariance, `INITIAL_VARIANCE`
+            on the diagonal by default
+
+    Returns:
+        dict of (tracks, steps, ...) arrays: the filtered state 'x' and
+        covariance 'p', and the predictions 'x_pred' and 'p_pred' that
+        `rts_smoother` needs
+    """
+
+    z = np.asarray(z, dtype=np.float64)
+    tracks, steps, sensors = z.shape
+    r = np.broadcast_to(np.asarray(r, dtype=np.float64), (tracks, sensors))
+    f, noise = transition(dt, q)
+
+    x = np.zeros((tracks, 2)) if x0 is None else np.array(x0, dtype=np.float64)
+    p = np.broadcast_to(INITIAL_VARIANCE * np.eye(2) if p0 is None else p0, (tracks, 2, 2)).copy()
+
+    # Time-major storage keeps every step contiguous
+    xs, ps = np.empty((steps, tracks, 2)), np.empty((steps, tracks, 2, 2))
+    x_pred, p_pred = np.empty((steps, tracks, 2)), np.empty((steps, tracks, 2, 2))
+    measurements = np.moveaxis(z, 1, 0)
+    for k in range(steps):
+        if k:
+            x = x @ f.T
+            p = f @ p @ f.T + noise
+        x_pred[k], p_pred[k] = x, p
+
+        for s in range(sensors):
+            measured = measurements[k, :, s]
+            valid = ~np.isnan(measured)
+            gain = p[:, :, 0] / (p[:, 0, 0] + r[:, s])[:, None]
+            gain[~valid] = 0
+            innovation = np.where(valid, measured - x[:, 0], 0)
+            x = x + gain * innovation[:, None]
+            p = p - gain[:, :, None] * p[:, None, 0, :]
+        xs[k], ps[k] = x, p
+
+    return {
+        'x': np.moveaxis(xs, 0, 1),
+        'p': np.moveaxis(ps, 0, 1),
+        'x_pred': np.moveaxis(x_pred, 0, 1),
+        'p_pred': np.moveaxis(p_pred, 0, 1),
+    }
+
+
+def rts_smoother(filtered, dt):
+    """ Rauch-Tung-Striebel smoothing of the output of `kalman_filter`.
+
+    Returns:
+        dict with the smoothed state 'x' and covariance 'p'
+    """
+
+    f, _ = transition(dt, 0)
+    x_f, p_f = np.moveaxis(filtered['x'], 1, 0), np.moveaxis(filtered['p'], 1, 0)
+    x_p, p_p = np.moveaxis(filtered['x_pred'], 1, 0), np.moveaxis(filtered['p_pred'], 1, 0)
+
+    xs, ps = x_f.copy(), p_f.copy()
+    for k in range(len(xs) - 2, -1, -1):
+        # C = P_f F^T P_pred^-1
+        gain = p_f[k] @ f.T @ _inv2(p_p[k + 1])
+        xs[k] = x_f[k] + (gain @ (xs[k + 1] - x_p[k + 1])[:, :, None])[:, :, 0]
+        ps[k] = p_f[k] + gain @ (ps[k + 1] - p_p[k + 1]) @ np.swapaxes(gain, 1, 2)
+
+    return {'x': np.moveaxis(xs, 0, 1), 'p': np.moveaxis(ps, 0, 1)}
+
+
+def _inv2(m):
+    """ Inverses of a stack of 2x2 matrices. """
+
+    inverse = np.empty_like(m)
+    inverse[:, 0, 0], inverse[:, 1, 1] = m[:, 1, 1], m[:, 0, 0]
+    inverse[:, 0, 1], inverse[:, 1, 0] = -m[:, 0, 1], -m[:, 1, 0]
+    inverse /= (m[:, 0, 0] * m[:, 1, 1] - m[:, 0, 1] * m[:, 1, 0])[:, None, None]
+    return inverse
@@ -0,0 +1,78 @@
+import numpy as np
+
+
+class DecimatedLine:
+    """ Line that only draws about two points per pixel column of the axes.
+
+    A pyramid of min/max reductions over 2, 4, 8, ... samples is computed once.
+    Whenever the x limits (or the figure size) change, the coarsest level that
+    still gives at least one bucket per pixel column is picked and its visible
+    part is drawn as min/max pairs, so spikes survive at every zoom level and
+    the number of drawn points does not depend on the recording length.
+
+    The x data must be sorted in ascending order.
+
+    Args:
+        ax: `matplotlib.axes.Axes` to draw into
+        x, y: full resolution data
+        min_level_size: the pyramid stops when a level is this short
+        **kwargs: passed to `matplotlib.axes.Axes.plot`
+    """
+
+    def __init__(self, ax, x, y, min_level_size=1024, **kwargs):
+        self.ax = ax
+        self.x = np.ascontiguousarray(x, dtype=np.float64)
+        self.y = np.ascontiguousarray(y, dtype=np.float64)
+
+        # levels[k - 1] holds (mins, maxs) over buckets of 2**k samples
+        self.levels = []
+        mins, maxs = self.y, self.y
+        while len(mins) > min_level_size:
+            starts = np.arange(0, len(mins), 2)
+            mins = np.minimum.reduceat(mins, starts)
+            maxs = np.maximum.reduceat(maxs, starts)
+            self.levels.append((mins, maxs))
+
+        # Start with the coarsest level, it spans the whole data range,
+        # which is what autoscaling needs to see.
+        self.line, = ax.plot(*self._level_data(len(self.levels), 0, len(self.x)), **kwargs)
+
+        # Matplotlib only keeps weak references to bound-method callbacks; the
+        # artist holds on to this object so it lives as long as the line
+        self.line._decimator = self
+        ax.callbacks.connect('xlim_changed', self.update)
+        ax.figure.canvas.mpl_connect('resize_event', self.update)
+
+    def get_xdata(self):
+        return self.x
+
+    def get_ydata(self):
+        return self.y
+
+    def update(self, *args):
+        """ Re-decimate the data for the current view. """
+
+        if len(self.x) == 0:
+            return
+        x0, x1 = self.ax.get_xlim()
+        # One sample beyond each edge keeps the line running out of the view
+        i0 = max(np.searchsorted(self.x, x0, side='left') - 1, 0)
+        i1 = min(np.searchsorted(self.x, x1, side='right') + 1, len(self.x))
+
+        columns = max(int(self.ax.bbox.width), 1)
+        n = max(i1 - i0, 1)
+        level = min(max(int(np.ceil(np.log2(n / columns))), 0), len(self.levels))
+        self.line.set_data(*self._level_data(level, i0, i1))
+
+    def _level_data(self, level, i0, i1):
+        if level == 0:
+            return self.x[i0:i1], self.y[i0:i1]
+
+        step = 1 << level
+        b0 = i0 >> level
+        b1 = (i1 + step - 1) >> level
+        mins, maxs = self.levels[level - 1]
+        # Both values of a bucket are drawn at the bucket's first x
+        x = np.repeat(self.x[b0 * step:b1 * step:step], 2)
+        y = np.column_stack((mins[b0:b1], maxs[b0:b1])).ravel()
+        return x, y
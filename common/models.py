@@ -0,0 +1,209 @@
+""" Sensor models with analytic Jacobians and closed-form starting points.
+
+The Jacobians have the layout `scipy.optimize.curve_fit` expects for *jac*:
+one row per sample, one column per parameter.
+"""
+import numpy as np
+
+KELVIN = 273.15
+
+
+def exp_func(t, a, b):
+    """ NTC resistance in Ohm at *t* °C, R = a * exp(b / T). """
+    return a * np.exp(b / (t + KELVIN))
+
+
+def exp_jac(t, a, b):
+    inv_t = 1 / (t + KELVIN)
+    e = np.exp(b * inv_t)
+    return np.stack((e, a * e * inv_t), axis=-1)
+
+
+def ntc_seed(t, r):
+    """ Exact least-squares solution of log(R) = log(a) + b / T.
+
+    The model is linear in log space, so this closed form is already close to
+    the least-squares fit in Ohm and makes a good starting point for it. Works
+    on the last axis, so 2-D inputs give one (a, b) pair per row.
+
+    Returns:
+        array [..., 2] with a and b
+    """
+
+    x = 1 / (np.asarray(t, dtype=np.float64) + KELVIN)
+    y = np.log(np.asarray(r, dtype=np.float64))
+    x_mean = x.mean(axis=-1, keepdims=True)
+    y_mean = y.mean(axis=-1, keepdims=True)
+    dx = x - x_mean
+    b = (dx * (y - y_mean)).sum(axis=-1) / (dx * dx).sum(axis=-1)
+    a = np.exp(y_mean[..., 0] - b * x_mean[..., 0])
+    return np.stack((a, b), axis=-1)
+
+
+def linear_func(t, a, b):
+    return a * t + b
+
+
+def linear_jac(t, a, b):
+    t = np.asarray(t, dtype=np.float64)
+    return np.stack((t, np.ones_like(t)), axis=-1)
+
+
+def linear_seed(t, y):
+    """ Exact least-squares slope and intercept of *y* over *t* on the last axis.
+
+    Returns:
+        array [..., 2] with the slope a and the intercept b of `linear_func`
+    """
+
+    t = np.asarray(t, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    t_mean = t.mean(axis=-1, keepdims=True)
+    y_mean = y.mean(axis=-1, keepdims=True)
+    dt = t - t_mean
+    a = (dt * (y - y_mean)).sum(axis=-1) / (dt * dt).sum(axis=-1)
+    b = y_mean[..., 0] - a * t_mean[..., 0]
+    return np.stack((a, b), axis=-1)
+
+
+def kings_law(q_sqrt, a, b):
+    """ Squared heating current of a hot-wire flow sensor, I^2 = a + b * sqrt(Q_m). """
+    return a + b * q_sqrt
+
+
+def kings_law_jac(q_sqrt, a, b):
+    q_sqrt = np.asarray(q_sqrt, dtype=np.float64)
+    return np.stack((np.ones_like(q_sqrt), q_sqrt), axis=-1)
+
+
+def kings_law_seed(q_sqrt, i_squared):
+    """ Exact least-squares a and b of `kings_law`, see `linear_seed`. """
+    return linear_seed(q_sqrt, i_squared)[..., ::-1]
+
+
+def voltage_divider(t, r1, r2):
+    """ Linearization circuit for NTC.
+
+    Vout = Vin * (R2 || R_ntc(t)) / (R1 + R2 || R_ntc(t))
+
+    Args:
+        t: temperature in °C
+        r1: resistance of R1 in Ohm
+        r2: resistance of R2 in Ohm
+
+    Returns:
+        Vout: output voltage of the voltage divider in V for the Vin = 5 V
+    """
+
+    return divider_output(t, r1, r2, 0.02, 3512.81)
+
+
+def divider_output(t, r1, r2, a, b, vin=5):
+    """ `voltage_divider` for an NTC with the `exp_func` parameters *a* and *b*. """
+
+    r_ntc = exp_func(t, a, b)
+    r2_ntc = (r2 * r_ntc) / (r2 + r_ntc)
+    return vin * r2_ntc / (r1 + r2_ntc)
+
+
+def voltage_divider_jac(t, r1, r2):
+    r_ntc = exp_func(t, 0.02, 3512.81)
+    r2_ntc = (r2 * r_ntc) / (r2 + r_ntc)
+    denom = (r1 + r2_ntc) ** 2
+    d_r1 = -5 * r2_ntc / denom
+    d_r2 = 5 * r1 / denom * (r_ntc / (r2 + r_ntc)) ** 2
+    return np.stack((d_r1, d_r2), axis=-1)
+
+
+def steinhart_hart(t, a, b, c):
+    """ NTC resistance in Ohm at *t* °C from 1/T = a + b ln(R) + c ln(R)^3.
+
+    The cubic in ln(R) is solved in closed form: Cardano's formula where it
+    has one real root (the physical case b, c > 0), the trigonometric form
+    where it has three, taking the root closest to the c = 0 solution, and
+    ln(R) = (1/T - a) / b for the two-term model with c = 0.
+    """
+
+    inv_t = 1 / (np.asarray(t, dtype=np.float64) + KELVIN)
+    linear = (inv_t - a) / b
+    if np.all(c == 0):
+        return np.exp(linear)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = b / c
+        q = (a - inv_t) / c
+        disc = q * q / 4 + p ** 3 / 27
+        root = np.sqrt(disc)
+        cardano = np.cbrt(-q / 2 + root) + np.cbrt(-q / 2 - root)
+
+        m = np.asarray(2 * np.sqrt(-p / 3))
+        theta = np.arccos(np.clip(3 * q / (p * m), -1, 1)) / 3
+        roots = m[..., None] * np.cos(theta[..., None] - 2 * np.pi / 3 * np.arange(3))
+        nearest = np.take_along_axis(roots, np.abs(roots - linear[..., None]).argmin(axis=-1)[..., None], -1)[..., 0]
+
+    x = np.where(c == 0, linear, np.where(disc >= 0, cardano, nearest))
+    return np.exp(x)
+
+
+def steinhart_hart_jac(t, a, b, c):
+    r = steinhart_hart(t, a, b, c)
+    x = np.log(r)
+    # Implicit derivative of a + b x + c x^3 - 1/T = 0, times dR/dx = R
+    scale = -r / (b + 3 * c * x * x)
+    return np.stack((scale, scale * x, scale * x ** 3), axis=-1)
+
+
+def steinhart_hart_temperature(r, a, b, c):
+    """ Temperature in °C of an NTC with resistance *r* Ohm. """
+
+    x = np.log(r)
+    return 1 / (a + b * x + c * x ** 3) - KELVIN
+
+
+def steinhart_hart_seed(t, r, terms=3):
+    """ Exact least-squares fit of 1/T = a + b ln(R) [+ c ln(R)^3].
+
+    Args:
+        t: temperature in °C
+        r: resistance in Ohm
+        terms: 3 for the full model, 2 drops the cubic term (c = 0)
+
+    Returns:
+        array [a, b, c]
+    """
+
+    x = np.log(np.asarray(r, dtype=np.float64))
+    columns = [np.ones_like(x), x, x ** 3][:terms]
+    coefs, *_ = np.linalg.lstsq(np.column_stack(columns), 1 / (np.asarray(t, dtype=np.float64) + KELVIN),
+                                rcond=None)
+    return np.append(coefs, np.zeros(3 - terms))
+
+
+def fit_ntc(t, r, model='beta', **kwargs):
+    """ Fit an NTC characteristic in Ohm space from a closed-form start.
+
+    Args:
+        t: temperature in °C
+        r: resistance in Ohm
+        model: 'beta' for `exp_func`, 'steinhart-hart' for `steinhart_hart`
+        **kwargs: passed to `scipy.optimize.curve_fit`
+
+    Returns:
+        (popt, pcov)
+    """
+
+    from scipy.optimize import curve_fit
+
+    if model == 'beta':
+        func, jac, p0 = exp_func, exp_jac, ntc_seed(t, r)
+    elif model == 'steinhart-hart':
+        func, jac, p0 = steinhart_hart, steinhart_hart_jac, steinhart_hart_seed(t, r)
+    else:
+        raise ValueError(f"Unknown NTC model {model}")
+    if not np.isfinite(func(t, *p0)).all():
+        raise ValueError(f"The {model} model has no finite values at the starting point {p0}")
+
+    popt, pcov = curve_fit(func, t, r, p0=p0, jac=jac, **kwargs)
+    if not (np.isfinite(popt).all() and np.isfinite(func(t, *popt)).all()):
+        raise RuntimeError(f"The {model} fit ended at {popt} with non-finite values")
+    return popt, pcov
@@ -0,0 +1,106 @@
+import os
+import warnings
+
+import numpy as np
+
+
+def parse_bytes(data, schema):
+    """ Parse delimited text straight into one NumPy array per column.
+
+    The whole buffer is handed to NumPy's C tokenizer in a single call, so no
+    Python object is created per number and no per-element branching happens.
+
+    Args:
+        data: raw file contents (bytes), one record per line
+        schema: `common.schema.Schema` describing the line layout
+
+    Returns:
+        dict mapping column name to a contiguous 1-D array
+    """
+
+    delimiter = schema.delimiter
+    if delimiter is not None and not delimiter.isspace():
+        data = data.replace(delimiter.encode(), b' ')
+
+    with warnings.catch_warnings():
+        # NumPy only warns when it stops at a malformed token
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            values = np.fromstring(data, dtype=schema.parse_dtype, sep=' ')
+        except DeprecationWarning:
+            raise ValueError("Malformed number in input data") from None
+
+    n_cols = len(schema.columns)
+    if values.size % n_cols != 0:
+        raise ValueError(f"Expected {n_cols} columns, got {values.size} values "
+                         f"which is not a multiple of {n_cols}")
+
+    return schema.cast(values.reshape(-1, n_cols))
+
+
+def read_columns(file_name, schema, workers=1, min_part_bytes=16 << 20):
+    """ Read a whole delimited text file into typed column arrays.
+
+    With *workers* > 1 the file is split into byte ranges that end on line
+    boundaries, the ranges are parsed in a process pool and the columns are
+    concatenated in file order, so the result is identical to a serial read.
+
+    Args:
+        file_name: path to the text file
+        schema: `common.schema.Schema` describing the line layout
+        workers: number of processes, None uses every CPU
+        min_part_bytes: files are not split into ranges smaller than this
+
+    Returns:
+        dict mapping column name to a contiguous 1-D array
+    """
+
+    if workers is None:
+        workers = os.cpu_count()
+    n_parts = min(workers, os.path.getsize(file_name) // min_part_bytes)
+
+    if n_parts <= 1:
+        with open(file_name, 'rb') as file:
+            data = file.read()
+        return parse_bytes(data, schema)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    ranges = split_lines(file_name, n_parts)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(_parse_range, [file_name] * len(ranges), ranges,
+                              [schema] * len(ranges)))
+    return {name: np.concatenate([part[name] for part in parts])
+            for name in schema.names}
+
+
+def split_lines(file_name, n_parts):
+    """ Split a file into about *n_parts* byte ranges ending on line boundaries.
+
+    Every boundary is placed right after a newline, so each line falls into
+    exactly one range and the ranges cover the file in order.
+
+    Returns:
+        list of (start, end) byte offsets
+    """
+
+    size = os.path.getsize(file_name)
+    bounds = [0]
+    with open(file_name, 'rb') as file:
+        for k in range(1, n_parts):
+            pos = max(size * k // n_parts, bounds[-1])
+            if pos >= size:
+                break
+            file.seek(pos)
+            file.readline()
+            bounds.append(min(file.tell(), size))
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _parse_range(file_name, byte_range, schema):
+    start, end = byte_range
+    with open(file_name, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    return parse_bytes(data, schema)
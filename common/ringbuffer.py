@@ -0,0 +1,71 @@
+import threading
+
+import numpy as np
+
+
+class RingBuffer:
+    """ Fixed-size buffer holding the most recent rows of a recording.
+
+    Storage is allocated once per column. Writers and readers may live in
+    different threads; the lock is only held while rows are copied.
+
+    Args:
+        schema: `common.schema.Schema` of the rows
+        capacity: number of rows kept
+    """
+
+    def __init__(self, schema, capacity):
+        self.capacity = capacity
+        self.columns = {c.name: np.zeros(capacity, dtype=c.dtype) for c in schema.columns}
+        # Index of the next row to write and number of valid rows
+        self.head = 0
+        self.count = 0
+        # Total number of rows ever written, lets readers detect new data
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def extend(self, block):
+        """ Append a block of rows, overwriting the oldest ones. """
+
+        n = len(next(iter(block.values())))
+        if n == 0:
+            return
+        # Rows that would be overwritten within this block are skipped
+        skip = max(0, n - self.capacity)
+
+        with self._lock:
+            start = (self.head + skip) % self.capacity
+            first = min(n - skip, self.capacity - start)
+            for name, column in self.columns.items():
+                values = block[name]
+                column[start:start + first] = values[skip:skip + first]
+                column[:n - skip - first] = values[skip + first:]
+            self.head = (self.head + n) % self.capacity
+            self.count = min(self.count + n, self.capacity)
+            self.total += n
+
+    def snapshot(self, out):
+        """ Copy the valid rows, oldest first, into preallocated arrays.
+
+        Args:
+            out: dict mapping column name to an array of at least *capacity*
+                elements, e.g. from `empty_like`
+
+        Returns:
+            number of rows copied to the beginning of every array in *out*
+        """
+
+        with self._lock:
+            n = self.count
+            start = (self.head - n) % self.capacity
+            first = min(n, self.capacity - start)
+            for name, target in out.items():
+                column = self.columns[name]
+                target[:first] = column[start:start + first]
+                target[first:n] = column[:n - first]
+        return n
+
+    def empty_like(self):
+        """ Allocate arrays suitable for `snapshot`. """
+
+        return {name: np.empty_like(column) for name, column in self.columns.items()}
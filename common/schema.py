@@ -0,0 +1,97 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Column:
+    """ One field of a recording line.
+
+    Args:
+        name: key under which the column is stored
+        dtype: NumPy dtype the column is kept in
+        unit: physical unit, for labels and documentation only
+    """
+
+    name: str
+    dtype: str
+    unit: str = ''
+
+
+@dataclass(frozen=True)
+class Schema:
+    """ Column layout of one recording type.
+
+    Everything the parser needs (the dtype to tokenize into, the per-column
+    casts and their valid ranges) is derived once here, so parsing a file is
+    just a tokenizer call followed by one cast per column.
+
+    Args:
+        columns: the fields of a line in file order
+        delimiter: field separator, None means any whitespace
+    """
+
+    columns: tuple
+    delimiter: str = None
+    parse_dtype: np.dtype = field(init=False, repr=False, compare=False)
+    limits: dict = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'columns', tuple(self.columns))
+
+        dtypes = [np.dtype(c.dtype) for c in self.columns]
+        if all(dt.kind in 'iu' for dt in dtypes):
+            parse_dtype = np.dtype(np.int64)
+        else:
+            parse_dtype = np.dtype(np.float64)
+        object.__setattr__(self, 'parse_dtype', parse_dtype)
+
+        # Integer columns narrower than the tokenizer output need a range check,
+        # otherwise out-of-range values would silently wrap around.
+        limits = {}
+        for column, dt in zip(self.columns, dtypes):
+            if dt.kind in 'iu' and dt != parse_dtype:
+                info = np.iinfo(dt)
+                limits[column.name] = (info.min, info.max)
+        object.__setattr__(self, 'limits', limits)
+
+    @property
+    def names(self):
+        return [c.name for c in self.columns]
+
+    @property
+    def row_nbytes(self):
+        """ Size of one parsed row in bytes. """
+        return sum(np.dtype(c.dtype).itemsize for c in self.columns)
+
+    def cast(self, table):
+        """ Split a (rows, columns) table into typed, contiguous columns. """
+
+        out = {}
+        for i, column in enumerate(self.columns):
+            values = table[:, i]
+            if column.name in self.limits and values.size:
+                low, high = self.limits[column.name]
+                if values.min() < low or values.max() > high:
+                    raise ValueError(f"Column '{column.name}' does not fit "
+                                     f"into {column.dtype}")
+            out[column.name] = values.astype(column.dtype)
+        return out
+
+
+# lab3: Excel serial time followed by four resistance/temperature readings
+MEASUREMENTS = Schema([
+    Column('meas_time', 'float64', 'day'),
+    Column('ntc2', 'float32', 'Ohm'),
+    Column('ntc1', 'float32', 'Ohm'),
+    Column('egr_sens', 'float32', 'Ohm'),
+    Column('pt100', 'float32', '°C'),
+], delimiter=';')
+
+# lab4: device timestamp, both distance sensors and the fourth raw field
+RECORDING = Schema([
+    Column('t', 'int32', 'ms'),
+    Column('ultra_sound', 'uint16', 'cm'),
+    Column('lidar', 'uint16', 'cm'),
+    Column('raw', 'uint16'),
+])
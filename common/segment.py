@@ -0,0 +1,128 @@
+""" Split a stepped recording into its steady plateaus.
+
+A sample belongs to a plateau when the standard deviation of every signal in
+a centered window around it is small. The rolling standard deviation comes
+from cumulative sums of the values and of their squares, so all signals are
+handled in one pass without a loop over windows; the steps between plateaus
+are the change points where it rises. Plateau means and spreads are differences
+of the same kind of prefix sums at the plateau boundaries.
+"""
+import numpy as np
+
+
+def rolling_std(values, window):
+    """ Standard deviation over a centered window along the last axis.
+
+    Samples closer than half a window to either end, where the window does
+    not fit, get infinity.
+    """
+
+    return _rolling_std(*_prefix_sums(np.asarray(values, dtype=np.float64)), window)
+
+
+def find_plateaus(t, signals, window=25, max_std=0.5, min_duration=1.0):
+    """ Steady plateaus where all *signals* hold their level.
+
+    Args:
+        t: sample times in s
+        signals: (n_signals, samples) values, e.g. both distance sensors
+        window: samples in the rolling window
+        max_std: largest rolling standard deviation of a steady sample
+        min_duration: shorter plateaus in s are dropped
+
+    Returns:
+        dict with per-plateau arrays: 'start' and 'stop' sample indices,
+        't_start' and 't_stop' in s, and 'mean' and 'std' of shape
+        (plateaus, n_signals)
+    """
+
+    t = np.asarray(t, dtype=np.float64)
+    signals = np.atleast_2d(np.asarray(signals, dtype=np.float64))
+
+    sums, squares = _prefix_sums(signals)
+    steady = (_rolling_std(sums, squares, window) <= max_std).all(axis=0)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], steady.view(np.int8), [0]))))
+    start, stop = edges[::2], edges[1::2]
+    keep = t[stop - 1] - t[start] >= min_duration
+    start, stop = start[keep], stop[keep]
+
+    count = stop - start
+    mean = (sums[:, stop] - sums[:, start]) / count
+    var = (squares[:, stop] - squares[:, start]) / count - mean * mean
+    std = np.sqrt(np.maximum(var, 0))
+    # Undo the shift of the prefix sums
+    mean += signals[:, :1]
+
+    return {
+        'start': start,
+        'stop': stop,
+        't_start': t[start],
+        't_stop': t[stop - 1],
+        'mean': mean.T,
+        'std': std.T,
+    }
+
+
+def merge_plateaus(plateaus, n_sigma=3.0, min_difference=0.0):
+    """ Merge adjacent plateaus whose means are statistically equal.
+
+    A plateau split by a short disturbance (a bump of the rig, a spike)
+    shows up as two neighbours at the same level. Neighbours are merged when
+    for every signal their means differ by at most *n_sigma* standard errors
+    of the difference or by *min_difference*, e.g. the sensor resolution.
+
+    Args:
+        plateaus: dict returned by `find_plateaus`
+        n_sigma: standard errors within which two means are equal
+        min_difference: differences up to this are always equal
+
+    Returns:
+        dict like *plateaus* with the merged plateaus
+    """
+
+    if len(plateaus['start']) < 2:
+        return plateaus
+    count = (plateaus['stop'] - plateaus['start'])[:, None]
+    mean, std = plateaus['mean'], plateaus['std']
+    error = np.sqrt(std[1:] ** 2 / count[1:] + std[:-1] ** 2 / count[:-1])
+    difference = np.abs(np.diff(mean, axis=0))
+    same = (difference <= np.maximum(n_sigma * error, min_difference)).all(axis=1)
+
+    first = np.flatnonzero(np.concatenate(([True], ~same)))
+    last = np.append(first[1:], len(mean)) - 1
+
+    total = np.add.reduceat(count, first)
+    merged_mean = np.add.reduceat(count * mean, first) / total
+    square = np.add.reduceat(count * (std ** 2 + mean ** 2), first) / total
+    return {
+        'start': plateaus['start'][first],
+        'stop': plateaus['stop'][last],
+        't_start': plateaus['t_start'][first],
+        't_stop': plateaus['t_stop'][last],
+        'mean': merged_mean,
+        'std': np.sqrt(np.maximum(square - merged_mean ** 2, 0)),
+    }
+
+
+def _prefix_sums(values):
+    """ Cumulative sums of the values and their squares with a leading 0.
+
+    The values are shifted by the first sample, so the sums of squares do not
+    lose precision on signals far from zero.
+    """
+
+    values = values - values[..., :1]
+    pad = np.zeros(values.shape[:-1] + (1,))
+    sums = np.cumsum(np.concatenate((pad, values), axis=-1), axis=-1)
+    squares = np.cumsum(np.concatenate((pad, values * values), axis=-1), axis=-1)
+    return sums, squares
+
+
+def _rolling_std(sums, squares, window):
+    mean = (sums[..., window:] - sums[..., :-window]) / window
+    var = (squares[..., window:] - squares[..., :-window]) / window - mean * mean
+
+    std = np.full(sums.shape[:-1] + (sums.shape[-1] - 1,), np.inf)
+    half = window // 2
+    std[..., half:half + var.shape[-1]] = np.sqrt(np.maximum(var, 0))
+    return std
@@ -0,0 +1,75 @@
+""" Welch power spectral density of a streamed signal.
+
+The signal is cut into overlapping segments that are detrended, windowed and
+transformed; the averaged squared magnitudes are the PSD. Segments are formed
+as strided views of the carried tail plus the new block, so a block costs no
+copies beyond the segment buffer, which is allocated once together with the
+window. Only the unconsumed tail of a block (less than one segment) is kept
+between blocks, so memory does not grow with the length of the recording.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class WelchPSD:
+    """ One-sided Welch PSD accumulated block by block.
+
+    Matches ``scipy.signal.welch`` with its defaults (periodic Hann window,
+    constant detrend, density scaling) for the same *nperseg* and overlap.
+
+    Args:
+        nperseg: samples per segment
+        overlap: fraction of a segment shared with the next one
+        window: array of *nperseg* weights, a periodic Hann window by default
+        batch: segments transformed together
+    """
+
+    def __init__(self, nperseg=256, overlap=0.5, window=None, batch=256):
+        self.nperseg = nperseg
+        self.step = nperseg - int(nperseg * overlap)
+        self.window = np.hanning(nperseg + 1)[:-1] if window is None else np.asarray(window, dtype=np.float64)
+        self.power = np.zeros(nperseg // 2 + 1)
+        self.count = 0
+        self._buffer = np.empty((batch, nperseg))
+        self._tail = np.empty(0)
+
+    def update(self, values):
+        series = np.concatenate((self._tail, np.asarray(values, dtype=np.float64)))
+        if series.size < self.nperseg:
+            self._tail = series
+            return self
+
+        segments = sliding_window_view(series, self.nperseg)[::self.step]
+        batch = len(self._buffer)
+        for start in range(0, len(segments), batch):
+            chunk = segments[start:start + batch]
+            buffer = self._buffer[:len(chunk)]
+            np.subtract(chunk, chunk.mean(axis=1, keepdims=True), out=buffer)
+            buffer *= self.window
+            spectrum = np.fft.rfft(buffer, axis=1)
+            self.power += np.square(spectrum.real).sum(axis=0) + np.square(spectrum.imag).sum(axis=0)
+        self.count += len(segments)
+        self._tail = series[len(segments) * self.step:]
+        return self
+
+    def merge(self, other):
+        """ Pool the segments of another recording with the same settings. """
+
+        self.power += other.power
+        self.count += other.count
+        return self
+
+    def density(self, fs=1.0):
+        """ PSD in units²/Hz for the sample rate *fs* in Hz.
+
+        Returns:
+            (frequencies, psd)
+        """
+
+        psd = self.power / (self.count * fs * np.square(self.window).sum())
+        # Fold the negative frequencies onto the positive ones
+        if self.nperseg % 2:
+            psd[1:] *= 2
+        else:
+            psd[1:-1] *= 2
+        return np.fft.rfftfreq(self.nperseg, 1 / fs), psd
@@ -0,0 +1,185 @@
+import numpy as np
+
+
+class RunningStats:
+    """ Count, mean, variance, minimum and maximum of a growing series.
+
+    Blocks are folded in with Chan's parallel variant of Welford's update, so
+    the result does not depend on how the series was split and two instances
+    computed on different chunks (or files) can be merged.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return self
+        other = RunningStats()
+        other.count = values.size
+        other.mean = values.mean()
+        other.m2 = np.square(values - other.mean).sum()
+        other.min = values.min()
+        other.max = values.max()
+        return self.merge(other)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def var(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    @property
+    def snr(self):
+        """ Signal-to-noise ratio mean / std. """
+        return np.abs(self.mean) / self.std
+
+    @property
+    def snr_db(self):
+        return 20 * np.log10(self.snr)
+
+    def __repr__(self):
+        return (f"RunningStats(count={self.count}, mean={self.mean:.4g}, "
+                f"std={self.std:.4g}, min={self.min:.4g}, max={self.max:.4g})")
+
+
+class AllanDeviation:
+    """ Non-overlapping Allan deviation at octave cluster sizes 1, 2, 4, ...
+
+    The cluster means of size 2m are the pairwise means of those of size m,
+    so each level feeds the next one and all levels together cost O(n). Per
+    level only the last cluster mean, an unpaired one and the running sum of
+    squared differences are kept, so memory is constant however long the
+    series is.
+
+    Consecutive blocks of one series are passed to `update`. `merge` pools
+    independent series (e.g. other files); no difference is taken across the
+    seam between them.
+
+    Args:
+        levels: number of cluster sizes, the largest is ``2 ** (levels - 1)`` samples
+    """
+
+    def __init__(self, levels=16):
+        self.levels = levels
+        self.sum_sq = np.zeros(levels)
+        self.count = np.zeros(levels, dtype=np.int64)
+        self._last = [None] * levels
+        self._unpaired = [None] * levels
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        for level in range(self.levels):
+            if values.size == 0:
+                break
+            last = self._last[level]
+            series = values if last is None else np.concatenate(([last], values))
+            diff = np.diff(series)
+            self.sum_sq[level] += diff @ diff
+            self.count[level] += diff.size
+            self._last[level] = values[-1]
+
+            unpaired = self._unpaired[level]
+            if unpaired is not None:
+                values = np.concatenate(([unpaired], values))
+            pairs = values.size // 2
+            self._unpaired[level] = values[-1] if values.size % 2 else None
+            values = values[:2 * pairs].reshape(pairs, 2).mean(axis=1)
+        return self
+
+    def merge(self, other):
+        self.sum_sq += other.sum_sq
+        self.count += other.count
+        return self
+
+    @property
+    def m(self):
+        """ Cluster size in samples of every level. """
+        return 2 ** np.arange(self.levels)
+
+    @property
+    def adev(self):
+        """ Allan deviation per level, NaN where no differences were seen yet. """
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(self.sum_sq / (2 * self.count))
+
+
+class RollingWindow:
+    """ Mean and standard deviation over the last *window* samples of a stream.
+
+    Uses cumulative sums of the values and their squares; the last
+    ``window - 1`` samples of a block are carried into the next one, so the
+    result does not depend on the block size.
+    """
+
+    def __init__(self, window):
+        if window < 2:
+            raise ValueError(f"Window of {window} samples has no standard deviation")
+        self.window = window
+        self._tail = np.empty(0)
+        # Sums of squares relative to the first sample keep their precision
+        self._reference = None
+
+    def update(self, values):
+        """ Rolling stats of the windows ending at every sample of *values*.
+
+        Returns:
+            (mean, std) arrays like *values*, NaN until the window is full
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+        mean = np.full(values.size, np.nan)
+        std = np.full(values.size, np.nan)
+        if values.size == 0:
+            return mean, std
+        if self._reference is None:
+            self._reference = values[0]
+
+        w = self.window
+        series = np.concatenate((self._tail, values - self._reference))
+        if series.size >= w:
+            sums = np.concatenate(([0.0], np.cumsum(series)))
+            squares = np.concatenate(([0.0], np.cumsum(series * series)))
+            window_mean = (sums[w:] - sums[:-w]) / w
+            window_var = ((squares[w:] - squares[:-w]) - w * window_mean ** 2) / (w - 1)
+            mean[-window_mean.size:] = window_mean + self._reference
+            std[-window_mean.size:] = np.sqrt(np.maximum(window_var, 0))
+        self._tail = series[max(series.size - (w - 1), 0):]
+        return mean, std
+
+
+def column_stats(blocks):
+    """ Compute `RunningStats` of every column of a block stream.
+
+    Args:
+        blocks: iterable of column blocks, e.g. from `common.stream.iter_blocks`
+
+    Returns:
+        dict mapping column name to its `RunningStats`
+    """
+
+    stats = {}
+    for block in blocks:
+        for name, values in block.items():
+            stats.setdefault(name, RunningStats()).update(values)
+    return stats
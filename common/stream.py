@@ -0,0 +1,157 @@
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from common.parser import parse_bytes
+
+
+def iter_blocks(file_name, schema, block_rows=65536, chunk_bytes=4 << 20):
+    """ Read a recording as a sequence of fixed-size column blocks.
+
+    The file is read in *chunk_bytes* pieces cut at the last complete line, so
+    the working set stays at a few chunks no matter how large the file is.
+
+    Args:
+        file_name: path to the text file
+        schema: `common.schema.Schema` describing the line layout
+        block_rows: number of rows per yielded block (the last one may be shorter)
+        chunk_bytes: size of a single read from the file
+
+    Yields:
+        dict mapping column name to a 1-D array of *block_rows* values
+    """
+
+    pending = None
+    tail = b''
+    with open(file_name, 'rb') as file:
+        while True:
+            chunk = file.read(chunk_bytes)
+            if not chunk:
+                break
+
+            data = tail + chunk
+            cut = data.rfind(b'\n') + 1
+            tail = data[cut:]
+            if cut == 0:
+                continue
+
+            pending = _append(pending, parse_bytes(data[:cut], schema))
+            while len(pending[schema.columns[0].name]) >= block_rows:
+                yield {k: v[:block_rows] for k, v in pending.items()}
+                pending = {k: v[block_rows:] for k, v in pending.items()}
+
+    # The last line does not have to end with a newline
+    if tail.strip():
+        pending = _append(pending, parse_bytes(tail, schema))
+    if pending is not None and len(pending[schema.columns[0].name]):
+        yield pending
+
+
+def _append(pending, block):
+    if pending is None:
+        return block
+    return {k: np.concatenate((pending[k], block[k])) for k in pending}
+
+
+def write_npz(blocks, target, schema):
+    """ Stream column blocks into an uncompressed .npz file.
+
+    `np.savez` needs every array in memory at once. Here each column is spooled
+    to a temporary file next to *target* first, and once the row count is known
+    the spooled data is copied into the archive behind a regular .npy header.
+
+    Args:
+        blocks: iterable of column blocks, e.g. from `iter_blocks`
+        target: path of the .npz file to write
+        schema: `common.schema.Schema` of the blocks
+
+    Returns:
+        number of rows written
+    """
+
+    target = Path(target)
+    n_rows = 0
+    with tempfile.TemporaryDirectory(dir=target.parent) as tmp:
+        spools = {c.name: open(Path(tmp) / c.name, 'wb+') for c in schema.columns}
+        try:
+            for block in blocks:
+                for name, spool in spools.items():
+                    block[name].tofile(spool)
+                n_rows += len(block[schema.columns[0].name])
+
+            with zipfile.ZipFile(target, 'w', allowZip64=True) as archive:
+                for column in schema.columns:
+                    header = {
+                        'descr': np.lib.format.dtype_to_descr(np.dtype(column.dtype)),
+                        'fortran_order': False,
+                        'shape': (n_rows,),
+                    }
+                    spool = spools[column.name]
+                    spool.seek(0)
+                    with archive.open(column.name + '.npy', 'w', force_zip64=True) as member:
+                        np.lib.format.write_array_header_1_0(member, header)
+                        shutil.copyfileobj(spool, member, 1 << 20)
+        finally:
+            for spool in spools.values():
+                spool.close()
+    return n_rows
+
+
+def minmax_decimate(values, factor):
+    """ Reduce a series to the minimum and maximum of every *factor* samples.
+
+    Unlike plain subsampling this keeps single-sample spikes visible.
+
+    Args:
+        values: 1-D array
+        factor: bucket size, the trailing partial bucket is reduced as well
+
+    Returns:
+        (mins, maxs) arrays with one value per bucket
+    """
+
+    starts = np.arange(0, len(values), factor)
+    return np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts)
+
+
+def decimate_blocks(blocks, x, y, factor):
+    """ Min/max decimate one column of a block stream for plotting.
+
+    A bucket may span two blocks, so the incomplete tail of every block is
+    carried over into the next one.
+
+    Args:
+        blocks: iterable of column blocks, e.g. from `iter_blocks`
+        x: name of the column used as the horizontal axis
+        y: name of the column to decimate
+        factor: number of samples per bucket
+
+    Returns:
+        (x, y) arrays with two points per bucket, drawn at the bucket's first x
+    """
+
+    xs, ys = [], []
+    carry_x = carry_y = None
+    for block in blocks:
+        bx, by = block[x], block[y]
+        if carry_x is not None:
+            bx = np.concatenate((carry_x, bx))
+            by = np.concatenate((carry_y, by))
+        full = len(bx) - len(bx) % factor
+        carry_x, carry_y = bx[full:], by[full:]
+        if full:
+            mins, maxs = minmax_decimate(by[:full], factor)
+            xs.append(bx[:full:factor])
+            ys.append(np.column_stack((mins, maxs)))
+
+    if carry_x is not None and len(carry_x):
+        mins, maxs = minmax_decimate(carry_y, factor)
+        xs.append(carry_x[:1])
+        ys.append(np.column_stack((mins, maxs)))
+
+    if not xs:
+        return np.empty(0), np.empty(0)
+    return np.repeat(np.concatenate(xs), 2), np.concatenate(ys).ravel()
@@ -0,0 +1,226 @@
+""" Put recordings on a common clock and look up time ranges quickly.
+
+The devices log several rows with the same timestamp and an irregular
+spacing of about 20 ms. `collapse_duplicates` averages the rows of every
+timestamp and `resample` interpolates all channels onto one uniform grid.
+
+`select` returns a time range of a cached recording with two binary searches
+on the memory-mapped time column and a slice of the other columns, so only
+the pages of the range are read. Whether the time column is sorted is kept
+in ``index.json`` in the cache directory and checked only for rows appended
+since; recordings that are not sorted get a stored sort order instead.
+"""
+import json
+import os
+
+import numpy as np
+
+from common import cache
+
+INDEX = 'index.json'
+# Rows checked at a time when building the index
+SCAN_ROWS = 1 << 20
+
+
+def collapse_duplicates(t, columns):
+    """ Average the rows that share a timestamp.
+
+    Args:
+        t: timestamps, sorted
+        columns: dict of arrays like *t*
+
+    Returns:
+        (unique timestamps, dict of the averaged columns as float64)
+    """
+
+    t = np.asarray(t)
+    starts = np.flatnonzero(np.concatenate(([True], t[1:] != t[:-1])))
+    counts = np.diff(np.append(starts, len(t)))
+    averaged = {name: np.add.reduceat(np.asarray(values, dtype=np.float64), starts) / counts
+                for name, values in columns.items()}
+    return t[starts], averaged
+
+
+def resample(t, columns, period, method='linear'):
+    """ Resample channels logged at irregular times onto a uniform grid.
+
+    Args:
+        t: timestamps, sorted, duplicates allowed
+        columns: dict of arrays like *t*
+        period: grid spacing in the unit of *t*
+        method: 'linear' interpolation or the 'nearest' sample
+
+    Returns:
+        dict with the grid under 't' and the resampled columns
+    """
+
+    _check_method(method)
+    t, columns = collapse_duplicates(t, columns)
+    t = t.astype(np.float64)
+    grid = t[0] + period * np.arange(int((t[-1] - t[0]) // period) + 1)
+    return {'t': grid, **_interpolate(t, columns, grid, method)}
+
+
+def iter_resampled(t, columns, period, method='linear', block=1 << 20):
+    """ `resample` a long recording block by block.
+
+    Yields the consecutive pieces of the grid `resample` returns, about
+    *block* rows of *t* at a time, so the memory-mapped columns of a
+    recording of any length are resampled in bounded memory.
+    """
+
+    _check_method(method)
+    anchor = None
+    start = 0
+    while start < len(t):
+        stop = min(start + block, len(t))
+        if stop < len(t):
+            # End the block at the first row of its last timestamp, so rows
+            # with the same timestamp are averaged together
+            stop = start + max(int(np.searchsorted(t[start:stop], t[stop - 1])), 1)
+        times, values = collapse_duplicates(t[start:stop], {name: columns[name][start:stop] for name in columns})
+        times = times.astype(np.float64)
+        if anchor is None:
+            t0 = times[0]
+            first = 0
+        else:
+            # The last sample of the previous block bridges the gap to this one
+            times = np.concatenate(([anchor[0]], times))
+            values = {name: np.concatenate(([anchor[1][name]], values[name])) for name in values}
+            first = int((anchor[0] - t0) // period) + 1
+        grid = t0 + period * np.arange(first, int((times[-1] - t0) // period) + 1)
+        anchor = times[-1], {name: values[name][-1] for name in values}
+        start = stop
+        if len(grid):
+            yield {'t': grid, **_interpolate(times, values, grid, method)}
+
+
+def time_index(source, schema, column='t'):
+    """ Bring the time index of a cached recording up to date.
+
+    Returns:
+        (columns, order): the memory-mapped columns and None if *column* is
+        sorted, otherwise the stored stable sort order
+    """
+
+    meta = cache.update(source, schema)
+    columns = cache.open_columns(source, meta)
+    times = columns[column]
+    directory = cache.cache_dir(source)
+
+    index = _read_index(directory)
+    if index is None or index['column'] != column or index['rows'] > meta['offset_rows']:
+        index = {'column': column, 'rows': 0, 'sorted': True, 'size': None}
+
+    # Only rows appended since the last check are checked. The row of an
+    # unterminated last line is parsed again on the next append, so it is
+    # checked apart from the rows before it
+    if index['size'] != meta['size']:
+        stable = meta['offset_rows']
+        index['sorted'] = index['sorted'] and _is_sorted(times[:stable], max(index['rows'] - 1, 0))
+        index['ordered'] = index['sorted'] and _is_sorted(times, max(stable - 1, 0))
+        if not index['ordered']:
+            np.argsort(times, kind='stable').tofile(directory / 'order.bin')
+        index.update(rows=stable, size=meta['size'])
+        _write_index(directory, index)
+
+    order = None
+    if not index['ordered'] and meta['rows']:
+        order = np.memmap(directory / 'order.bin', dtype=np.intp, mode='r', shape=(meta['rows'],))
+    return columns, order
+
+
+def select(source, schema, start, stop, column='t', scale=1000):
+    """ Rows of a cached recording between *start* and *stop* seconds.
+
+    Args:
+        source: path to the text recording
+        schema: `common.schema.Schema` describing the line layout
+        start, stop: seconds from the first timestamp, *stop* excluded
+        column: time column
+        scale: time column units per second, 1000 for milliseconds
+
+    Returns:
+        dict of the columns in the range, memory-mapped slices if the
+        recording is sorted by time
+    """
+
+    columns, order = time_index(source, schema, column)
+    times = columns[column]
+    if len(times) == 0:
+        return columns
+
+    if order is None:
+        t0 = times[0]
+        lo, hi = np.searchsorted(times, [t0 + start * scale, t0 + stop * scale])
+        return {name: values[lo:hi] for name, values in columns.items()}
+
+    t0 = times[order[0]]
+    sorted_times = _SortedView(times, order)
+    lo, hi = (_bisect(sorted_times, t0 + bound * scale) for bound in (start, stop))
+    rows = np.asarray(order[lo:hi])
+    return {name: np.asarray(values)[rows] for name, values in columns.items()}
+
+
+def _check_method(method):
+    if method not in ('linear', 'nearest'):
+        raise ValueError(f"Unknown resampling method {method}")
+
+
+def _interpolate(t, columns, grid, method):
+    if method == 'linear':
+        return {name: np.interp(grid, t, values) for name, values in columns.items()}
+    if len(t) == 1:
+        return {name: np.repeat(values, len(grid)) for name, values in columns.items()}
+    right = np.clip(np.searchsorted(t, grid), 1, len(t) - 1)
+    nearest = np.where(grid - t[right - 1] <= t[right] - grid, right - 1, right)
+    return {name: values[nearest] for name, values in columns.items()}
+
+
+class _SortedView:
+    """ Index *times* through *order* without materializing the sorted copy. """
+
+    def __init__(self, times, order):
+        self.times = times
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        return self.times[self.order[i]]
+
+
+def _bisect(values, target):
+    lo, hi = 0, len(values)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if values[mid] < target:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _is_sorted(times, first):
+    # Chunks overlap by one row so the order across their seam is checked too
+    for start in range(first, len(times) - 1, SCAN_ROWS):
+        chunk = np.asarray(times[start:start + SCAN_ROWS + 1])
+        if np.any(chunk[1:] < chunk[:-1]):
+            return False
+    return True
+
+
+def _read_index(directory):
+    try:
+        with open(directory / INDEX) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_index(directory, index):
+    tmp = directory / (INDEX + '.tmp')
+    with open(tmp, 'w') as file:
+        json.dump(index, file)
+    os.replace(tmp, directory / INDEX)
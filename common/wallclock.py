@@ -0,0 +1,151 @@
+""" Wall-clock time of recordings and summaries per time bucket.
+
+The lab3 logger stores its time as an Excel serial date, the days since
+1899-12-30 as a float in the local time of the logging PC. `excel_to_datetime64`
+decodes a whole column at once, `to_utc` attaches a time zone to it and
+`window` finds the rows between two wall-clock times with binary searches.
+
+`aggregate` summarizes columns per time bucket (a second, a minute, ...)
+with the min, mean and max of every bucket, computed by ``reduceat`` over
+the bucket starts. `reaggregate` turns such a summary into a coarser one from
+the bucket statistics alone, so a long soak test is reduced from its raw rows
+once and then viewed at any coarser resolution without reading them again.
+"""
+import datetime
+import re
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+EXCEL_EPOCH = np.datetime64('1899-12-30', 'ns')
+NS_PER_DAY = 86_400 * 10**9
+# Units of the period strings, e.g. '10s' or '1min'
+UNITS = {'ms': 'ms', 's': 's', 'min': 'm', 'h': 'h', 'D': 'D', 'W': 'W'}
+
+
+def excel_to_datetime64(serial):
+    """ Decode Excel serial dates into ``datetime64[ns]``.
+
+    Valid from 1900-03-01 on, before it Excel counts the nonexistent
+    1900-02-29.
+    """
+
+    ns = np.rint(np.asarray(serial, dtype=np.float64) * NS_PER_DAY).astype(np.int64)
+    return EXCEL_EPOCH + ns.view('timedelta64[ns]')
+
+
+def to_utc(times, tz):
+    """ Convert local wall-clock times in the zone *tz* to UTC.
+
+    The UTC offset is looked up once per distinct hour, not per row. Wall
+    times repeated when the clocks go back are taken as the first of the two.
+
+    Args:
+        times: naive ``datetime64`` local times
+        tz: zone name such as 'Europe/Ljubljana' or a `datetime.tzinfo`
+    """
+
+    tz = ZoneInfo(tz) if isinstance(tz, str) else tz
+    times = np.asarray(times, dtype='datetime64[ns]')
+    hours, inverse = np.unique(times.astype('datetime64[h]'), return_inverse=True)
+    offsets = np.array([tz.utcoffset(hour.item()) for hour in hours], dtype='timedelta64[us]')
+    return times - offsets.astype('timedelta64[ns]')[inverse.reshape(times.shape)]
+
+
+def window(times, start=None, stop=None, tz=None):
+    """ Slice of the rows from *start* to *stop*, which is excluded.
+
+    Args:
+        times: sorted naive ``datetime64`` local times
+        start, stop: ISO strings, ``datetime64`` or `datetime.datetime`, None
+            for the start or end of the recording. Times with a zone are
+            converted to the local time of the recording.
+        tz: time zone of the recording, required for bounds with a zone
+    """
+
+    lo = 0 if start is None else np.searchsorted(times, _local(start, tz))
+    hi = len(times) if stop is None else np.searchsorted(times, _local(stop, tz))
+    return slice(int(lo), int(hi))
+
+
+def aggregate(times, columns, period):
+    """ Min, mean and max of every column per time bucket.
+
+    Buckets are aligned to the calendar, e.g. to whole minutes, and only
+    buckets holding rows are returned.
+
+    Args:
+        times: sorted ``datetime64`` times
+        columns: dict of arrays like *times*
+        period: bucket length, a ``timedelta64`` or a string like '10s', '1min'
+
+    Returns:
+        dict with the bucket start times 't', the row counts 'count' and for
+        every column a dict with the arrays 'min', 'mean' and 'max'
+    """
+
+    t, starts = _buckets(times, period)
+    count = np.diff(np.append(starts, len(times)))
+    summary = {'t': t, 'count': count}
+    for name, values in columns.items():
+        values = np.asarray(values, dtype=np.float64)
+        summary[name] = {
+            'min': np.minimum.reduceat(values, starts),
+            'mean': np.add.reduceat(values, starts) / count,
+            'max': np.maximum.reduceat(values, starts),
+        }
+    return summary
+
+
+def reaggregate(summary, period):
+    """ Coarser summary from a summary of `aggregate`.
+
+    The result equals aggregating the raw rows when *period* is a multiple of
+    the period of *summary*.
+    """
+
+    t, starts = _buckets(summary['t'], period)
+    count = np.add.reduceat(summary['count'], starts)
+    coarse = {'t': t, 'count': count}
+    for name, stats in summary.items():
+        if name in ('t', 'count'):
+            continue
+        coarse[name] = {
+            'min': np.minimum.reduceat(stats['min'], starts),
+            'mean': np.add.reduceat(stats['mean'] * summary['count'], starts) / count,
+            'max': np.maximum.reduceat(stats['max'], starts),
+        }
+    return coarse
+
+
+def parse_period(period):
+    """ ``timedelta64`` from a period such as '10s', '1min' or '2h'. """
+
+    if isinstance(period, np.timedelta64):
+        return period
+    match = re.fullmatch(r'\s*(\d*)\s*([a-zA-Z]+)\s*', period)
+    if match is None or match[2] not in UNITS:
+        raise ValueError(f"Unknown period {period!r}, expected e.g. '10s' or '1min'")
+    return np.timedelta64(int(match[1] or 1), UNITS[match[2]])
+
+
+def _buckets(times, period):
+    """ Start times and first rows of the calendar-aligned buckets. """
+
+    step = int(parse_period(period) / np.timedelta64(1, 'ns'))
+    if step <= 0:
+        raise ValueError("The period must be positive")
+    bucket = np.asarray(times, dtype='datetime64[ns]').view(np.int64) // step
+    starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+    return (bucket[starts] * step).view('datetime64[ns]'), starts
+
+
+def _local(bound, tz):
+    if isinstance(bound, str):
+        bound = datetime.datetime.fromisoformat(bound)
+    if isinstance(bound, datetime.datetime) and bound.tzinfo is not None:
+        if tz is None:
+            raise ValueError("A time zone of the recording is needed for bounds with a zone")
+        tz = ZoneInfo(tz) if isinstance(tz, str) else tz
+        bound = bound.astimezone(tz).replace(tzinfo=None)
+    return np.datetime64(bound, 'ns')
@@ -0,0 +1,96 @@
+""" Delay between two streamed signals by FFT cross-correlation.
+
+Both signals are cut into overlapping windows; each window pair is
+detrended, zero-padded and cross-correlated through the FFT, and the lag of
+the correlation peak, refined to a fraction of a sample by a parabola through
+the peak and its neighbours, is the delay in that window. Windows are formed
+as strided views of the carried tails plus the new blocks and transformed in
+batches through buffers allocated once, so the cost is O(n log n) per window
+and the memory does not grow with the length of the recording.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class CrossCorrelation:
+    """ Lag of *b* behind *a* over sliding windows, accumulated block by block.
+
+    A positive lag means *b* follows *a*: ``b[n] ≈ a[n - lag]``.
+
+    Args:
+        window: samples per window
+        step: samples between the starts of consecutive windows, half a
+            window by default
+        max_lag: largest lag in samples searched, a quarter window by default
+        batch: windows transformed together
+    """
+
+    def __init__(self, window, step=None, max_lag=None, batch=64):
+        self.window = window
+        self.step = step or window // 2
+        self.max_lag = window // 4 if max_lag is None else max_lag
+        if not 0 < self.max_lag < window:
+            raise ValueError("max_lag must be between 0 and the window length")
+        # Zero padding to a power of two of at least window + max_lag keeps the
+        # circular correlation free of wrap-around within the searched lags
+        self.nfft = 1 << (window + self.max_lag - 1).bit_length()
+        self._buffers = np.zeros((2, batch, self.nfft))
+        self._tails = np.empty((2, 0))
+        self._offset = 0
+        self._results = {'start': [], 'lag': [], 'peak': []}
+
+    def update(self, a, b):
+        """ Feed the next samples of both signals, blocks of equal length. """
+
+        series = np.concatenate((self._tails, np.stack((np.asarray(a, dtype=np.float64),
+                                                        np.asarray(b, dtype=np.float64)))), axis=1)
+        if series.shape[1] < self.window:
+            self._tails = series
+            return self
+
+        windows = sliding_window_view(series, self.window, axis=1)[:, ::self.step]
+        count = windows.shape[1]
+        batch = self._buffers.shape[1]
+        for start in range(0, count, batch):
+            chunk = windows[:, start:start + batch]
+            self._correlate(chunk, self._buffers[:, :chunk.shape[1]])
+        self._results['start'].append(self._offset + self.step * np.arange(count))
+        self._offset += count * self.step
+        self._tails = series[:, count * self.step:]
+        return self
+
+    def result(self):
+        """ Lag per window.
+
+        Returns:
+            dict with the first sample 'start' and the 'center' of every
+            window, its 'lag' in samples and the normalized correlation
+            'peak' between -1 and 1, NaN for windows where a signal is flat
+        """
+
+        result = {name: np.concatenate(values) if values else np.empty(0)
+                  for name, values in self._results.items()}
+        result['center'] = result['start'] + (self.window - 1) / 2
+        return result
+
+    def _correlate(self, chunk, buffers):
+        """ Append the lags of a batch of (2, windows, samples) window pairs. """
+
+        data = buffers[:, :, :self.window]
+        np.subtract(chunk, chunk.mean(axis=2, keepdims=True), out=data)
+        norm = np.sqrt(np.square(data).sum(axis=2).prod(axis=0))
+        spectra = np.fft.rfft(buffers, axis=2)
+        # sum_n a[n] b[n + k]
+        corr = np.fft.irfft(spectra[0].conj() * spectra[1], self.nfft, axis=1)
+        lags = np.concatenate((corr[:, -self.max_lag:], corr[:, :self.max_lag + 1]), axis=1)
+
+        rows = np.arange(len(lags))
+        best = np.clip(np.argmax(lags, axis=1), 1, lags.shape[1] - 2)
+        left, center, right = lags[rows, best - 1], lags[rows, best], lags[rows, best + 1]
+        curvature = left - 2 * center + right
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shift = np.where(curvature < 0, 0.5 * (left - right) / curvature, 0.0)
+            peak = center / norm
+        flat = norm == 0
+        self._results['lag'].append(np.where(flat, np.nan, best - self.max_lag + shift))
+        self._results['peak'].append(np.where(flat, np.nan, peak))
@@ -1,7 +1,12 @@
+import sys
+from pathlib import Path
+
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
-from matplotlib.ticker import FuncFormatter
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from common.fitcache import cached_curve_fit
 
 # Data from the table
 U_fan = np.array([3.5, 4, 5, 6, 7, 8, 9, 10])
@@ -29,8 +34,8 @@ def linear_function(x, a, b):
 def formatter(x, pos):
     return '{:.1f}'.format(x * 1000)
 
-# Perform least squares fitting
-params, cov = curve_fit(linear_function, Q_sqrt_fit, I_squared_fit)
+# Perform least squares fitting, memoized on the data
+params, cov = cached_curve_fit(linear_function, Q_sqrt_fit, I_squared_fit)
 
 # Estimated parameters
 a, b = params
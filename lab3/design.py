@@ -0,0 +1,49 @@
+""" Pick standard resistors for the NTC linearization circuit.
+
+Ranks every R1/R2 pair of an E series by how far `voltage_divider` deviates
+from `ideal_characteristic` over -40...125 °C, for the datasheet NTC and the
+two fitted ones, next to the continuous optimum found by `curve_fit`.
+
+Usage: python design.py [--series E12|E24|E96] [--top N] [--by max|rms] [--worst-case]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from common.design import SERIES, search, series_values
+from common.models import divider_output
+from vis import fit_parameters, ideal_characteristic, load_measurements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--series', choices=sorted(SERIES), default='E24')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--by', choices=['max', 'rms'], default='max')
+    parser.add_argument('--worst-case', action='store_true', help='rank pairs by their worst NTC')
+    args = parser.parse_args()
+
+    params = fit_parameters(load_measurements())
+    ntcs = {'datasheet': (0.02, 3512.81), 'ntc1': params['ntc1'], 'ntc2': params['ntc2']}
+    names = list(ntcs)
+
+    t = np.linspace(-40, 125, 166)
+    r1, r2 = params['divider']
+    error = np.abs(divider_output(t, r1, r2, *ntcs['datasheet']) - ideal_characteristic(t))
+    print(f"curve_fit: R1 = {r1:.2f}, R2 = {r2:.2f}, max error {error.max():.4f} V, "
+          f"RMS error {np.sqrt(np.mean(error ** 2)):.4f} V (datasheet NTC)")
+
+    values = series_values(args.series)
+    best = search(values, values, list(ntcs.values()), ideal_characteristic, t=t, top=args.top,
+                  by=args.by, worst_case=args.worst_case)
+    print(f"\n{'R1':>10s} {'R2':>10s} {'NTC':>10s} {'max [V]':>8s} {'RMS [V]':>8s}")
+    for r1, r2, ntc, max_error, rms_error in zip(*best.values()):
+        print(f"{r1:10.0f} {r2:10.0f} {names[ntc]:>10s} {max_error:8.4f} {rms_error:8.4f}")
+
+
+if __name__ == '__main__':
+    main()
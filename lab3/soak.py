@@ -0,0 +1,77 @@
+""" Summarize a thermal soak recording per time bucket.
+
+The Excel serial time of the recording is decoded to local wall-clock time,
+the rows of the requested range are reduced to the min, mean and max of every
+sensor per bucket, and the summary is printed or plotted.
+
+Usage: python soak.py [--period 1min] [--start ISO] [--stop ISO] [--tz ZONE] [--plot] [recording]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from common import cache
+from common.schema import MEASUREMENTS
+from common.wallclock import aggregate, excel_to_datetime64, window
+
+DATA = Path(__file__).with_name('measurements.txt')
+SENSORS = [('ntc1', 'Ohm'), ('ntc2', 'Ohm'), ('egr_sens', 'Ohm'), ('pt100', '°C')]
+
+
+def summarize(file_name=DATA, period='1min', start=None, stop=None, tz=None):
+    """ Per-bucket statistics of the sensors, see `common.wallclock.aggregate`.
+
+    *start* and *stop* bound the local wall-clock time of the recording, *tz*
+    is its time zone and only needed for bounds with a zone.
+    """
+
+    data = cache.load(file_name, MEASUREMENTS)
+    times = excel_to_datetime64(data['meas_time'])
+    rows = window(times, start, stop, tz)
+    return aggregate(times[rows], {name: data[name][rows] for name, _ in SENSORS}, period)
+
+
+def draw_summary(axes, summary):
+    """ Draw the mean and the min-max band of every sensor on its own axes. """
+
+    for ax, (name, unit) in zip(axes, SENSORS):
+        stats = summary[name]
+        ax.fill_between(summary['t'], stats['min'], stats['max'], step='post', color='blue', alpha=0.3)
+        ax.step(summary['t'], stats['mean'], where='post', color='blue', linewidth=1)
+        ax.set_ylabel(f'{name} [{unit}]', fontsize=11)
+        ax.grid(True)
+    axes[-1].set_xlabel('Time', fontsize=11)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recording', nargs='?', default=DATA)
+    parser.add_argument('--period', default='1min', help="bucket length, e.g. '10s', '1min' or '1h'")
+    parser.add_argument('--start', help='ISO time of the first row, e.g. 2024-03-12T13:40')
+    parser.add_argument('--stop', help='ISO time after the last row')
+    parser.add_argument('--tz', help='time zone of the recording, e.g. Europe/Ljubljana')
+    parser.add_argument('--plot', action='store_true', help='plot instead of printing')
+    args = parser.parse_args()
+
+    summary = summarize(args.recording, args.period, args.start, args.stop, args.tz)
+    if args.plot:
+        import matplotlib.pyplot as plt
+
+        fig, axes = plt.subplots(len(SENSORS), 1, sharex=True, figsize=(8, 8))
+        draw_summary(axes, summary)
+        plt.show()
+        return
+
+    print(f"{'time':19}  {'rows':>5}" + ''.join(f"  {name + ' min/mean/max':>28}" for name, _ in SENSORS))
+    for i, t in enumerate(summary['t']):
+        stats = ''.join(f"  {summary[name]['min'][i]:8.2f} {summary[name]['mean'][i]:9.2f} {summary[name]['max'][i]:9.2f}"
+                        for name, _ in SENSORS)
+        print(f"{np.datetime_as_string(t, 's'):19}  {summary['count'][i]:5d}{stats}")
+
+
+if __name__ == '__main__':
+    main()
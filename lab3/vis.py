@@ -1,15 +1,25 @@
+import sys
+from pathlib import Path
+
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
-from scipy.optimize import least_squares
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-def exp_func(t, a, b):
-    return a * np.exp(b / (t + 273.15))
+from common import cache
+from common.calibration import Linear, NtcBeta
+from common.fitcache import cached_curve_fit
+from common.models import (exp_func, exp_jac, linear_func, linear_jac, ntc_seed, voltage_divider,
+                           voltage_divider_jac)
+from common.schema import MEASUREMENTS
 
+DATA = Path(__file__).with_name('measurements.txt')
+# Layout of the figure inputs, their caches are built before rendering
+SCHEMA = MEASUREMENTS
 
-def linear_func(t, a, b):
-    return a * t + b
+# Datasheet limits of the NTC resistance
+TEMP = np.array([-20, 0, 20, 40, 60, 80, 100])
+LL_NTC = np.array([10000, 4000, 1800, 800, 400, 200, 100])
+HL_NTC = np.array([20000, 7000, 3000, 1300, 700, 400, 220])
 
 
 def ideal_characteristic(t):
@@ -27,24 +37,6 @@ def ideal_characteristic(t):
     b = 4.5 + a * 40
     return a * t + b
 
-def voltage_divider(t, r1, r2):
-    """ Linearization circuit for NTC.
-
-    Vout = Vin * (R2 + R_ntc(t)) / (R1 + R2 + R_ntc(t))
-
-    Args:
-        t: temperature in °C
-        r1: resistance of R1 in Ohm
-        r2: resistance of R2 in Ohm
-
-    Returns:
-        Vout: output voltage of the voltage divider in V for the Vin = 1 V
-    """
-
-    r_ntc = exp_func(t, 0.02, 3512.81)
-    r2_ntc = (r2 * r_ntc) / (r2 + r_ntc)
-    return 5 * r2_ntc / (r1 + r2_ntc)
-
 # def residuals(params):
 #     r1, r2 = params
 #     t = np.linspace(-40, 125, 100)
@@ -52,128 +44,184 @@ def voltage_divider(t, r1, r2):
 #     ideal_lin = ideal_characteristic(t)
 #     return ntc_lin - ideal_lin
 
-def main():
-    temp = np.array([-20, 0, 20, 40, 60, 80, 100])
-    ll_ntc = np.array([10000, 4000, 1800, 800, 400, 200, 100])
-    hl_ntc = np.array([20000, 7000, 3000, 1300, 700, 400, 220])
-
-    data = np.load('measurements.npz')
-    meas_time = data['meas_time']
-    ntc1 = data['ntc1']
-    ntc2 = data['ntc2']
-    egr_sens = data['egr_sens']
-    pt100 = data['pt100']
+def load_measurements():
+    """ Load the measurements sorted by the PT100 temperature. """
+
+    data = cache.load(DATA, MEASUREMENTS)
 
     # Sort by temperature
-    order = np.argsort(pt100)
+    order = np.argsort(data['pt100'])
     # order = np.arange(len(pt100))
-    pt100 = pt100[order]
-    ntc1 = ntc1[order]
-    ntc2 = ntc2[order]
-    egr_sens = egr_sens[order]
+    return {name: np.asarray(values)[order] for name, values in data.items()}
 
-    # Curve fitting for NTC1
-    popt_ntc1, pcov_ntc1 = curve_fit(exp_func, pt100, ntc1, bounds=(0, np.inf))
-    print(f"NTC1 curve fitting parameters: a = {popt_ntc1[0]:.2f}, b = {popt_ntc1[1]:.2f}")
 
-    # Curve fitting for NTC2
-    popt_ntc2, pcov_ntc2 = curve_fit(exp_func, pt100, ntc2, bounds=(0, np.inf))
-    print(f"NTC2 curve fitting parameters: a = {popt_ntc2[0]:.2f}, b = {popt_ntc2[1]:.2f}")
+def fit_parameters(data):
+    """ Fit the NTC, EGR and linearization circuit models.
+
+    Results are memoized, unchanged data is not fitted again.
+
+    Returns:
+        dict with the fitted parameters of 'ntc1', 'ntc2', 'egr' and 'divider'
+    """
+
+    pt100 = data['pt100']
+    egr_sens = data['egr_sens']
+
+    # Curve fitting for NTC1 and NTC2
+    # starting from the closed-form fit in log space
+    popt_ntc1, pcov_ntc1 = cached_curve_fit(exp_func, pt100, data['ntc1'], p0=ntc_seed(pt100, data['ntc1']),
+                                            jac=exp_jac, bounds=(0, np.inf))
+    popt_ntc2, pcov_ntc2 = cached_curve_fit(exp_func, pt100, data['ntc2'], p0=ntc_seed(pt100, data['ntc2']),
+                                            jac=exp_jac, bounds=(0, np.inf))
+
+    # Interpolate the EGR data that are larger than 50 with the linear function
+    egr = egr_sens[egr_sens > 50]
+    temp_egr = pt100[egr_sens > 50]
+    popt_egr, pcov_egr = cached_curve_fit(linear_func, temp_egr, egr, jac=linear_jac)
+
+    # Fit the linearization circuit to the ideal characteristic
+    t = np.linspace(-40, 125, 100)
+    ideal_lin = ideal_characteristic(t)
+    popt_r, pcov_r = cached_curve_fit(voltage_divider, t, ideal_lin, jac=voltage_divider_jac,
+                                    bounds=(0, np.inf))
+
+    return {'ntc1': popt_ntc1, 'ntc2': popt_ntc2, 'egr': popt_egr, 'divider': popt_r}
+
+
+def plot_ntc_limits(name):
+    """ Plot the NTC resistance vs temperature with the low and high limits. """
+
+    import matplotlib.pyplot as plt
 
-    # Plotting NTC1 vs Temperature with Low and High Limits
-    plt.figure(figsize=(6, 4))
-    plt.plot(pt100, ntc1, marker='o', color='blue', linewidth=1, markeredgewidth=1, markersize=2)
-    plt.plot(temp[2:], ll_ntc[2:], marker='o', color='green', linewidth=2)
-    plt.plot(temp[2:], hl_ntc[2:], marker='s', color='red', linewidth=2)
+    data = load_measurements()
+    fig = plt.figure(figsize=(6, 4))
+    plt.plot(data['pt100'], data[name], marker='o', color='blue', linewidth=1, markeredgewidth=1, markersize=2)
+    plt.plot(TEMP[2:], LL_NTC[2:], marker='o', color='green', linewidth=2)
+    plt.plot(TEMP[2:], HL_NTC[2:], marker='s', color='red', linewidth=2)
     plt.xlabel('Temperature [°C]', fontsize=11)
-    plt.ylabel('NTC1 [Ohm]', fontsize=11)
+    plt.ylabel(f'{name.upper()} [Ohm]', fontsize=11)
     # plt.title('NTC1 Resistance vs Temperature', fontsize=16)
-    plt.legend(['NTC1', 'Low Limit', 'High Limit'])
+    plt.legend([name.upper(), 'Low Limit', 'High Limit'])
     plt.grid(True)
-    plt.show()
+    return fig
 
-    # Plotting NTC2 vs Temperature with Low and High Limits
-    plt.figure(figsize=(6, 4))
-    plt.plot(pt100, ntc2, marker='o', color='blue', linewidth=1, markeredgewidth=1, markersize=2)
-    plt.plot(temp[2:], ll_ntc[2:], marker='o', color='green', linewidth=2)
-    plt.plot(temp[2:], hl_ntc[2:], marker='s', color='red', linewidth=2)
-    plt.xlabel('Temperature [°C]', fontsize=11)
-    plt.ylabel('NTC2 [Ohm]', fontsize=11)
-    # plt.title('NTC2 Resistance vs Temperature', fontsize=16)
-    plt.legend(['NTC2', 'Low Limit', 'High Limit'])
-    plt.grid(True)
-    plt.show()
 
-    # Plotting NTC1 vs Temperature with extrapolated curve
-    plt.figure(figsize=(6, 4))
-    plt.plot(pt100, ntc1, marker='o', color='orange', linewidth=1, markeredgewidth=1, markersize=3)
-    plt.plot(pt100, exp_func(pt100, *popt_ntc1), color='blue', linestyle='--', linewidth=3)
+def plot_ntc_fit(name, popt):
+    """ Plot the NTC resistance vs temperature with the extrapolated curve. """
+
+    import matplotlib.pyplot as plt
+
+    data = load_measurements()
+    pt100 = data['pt100']
+    fig = plt.figure(figsize=(6, 4))
+    plt.plot(pt100, data[name], marker='o', color='orange', linewidth=1, markeredgewidth=1, markersize=3)
+    plt.plot(pt100, exp_func(pt100, *popt), color='blue', linestyle='--', linewidth=3)
     plt.xlabel('Temperature [°C]', fontsize=11)
-    plt.ylabel('NTC1 [Ohm]', fontsize=11)
+    plt.ylabel(f'{name.upper()} [Ohm]', fontsize=11)
     # plt.title('NTC1 Resistance vs Temperature with Extrapolated Curve', fontsize=16)
-    plt.legend(['NTC1', 'Extrapolated Curve'])
+    plt.legend([name.upper(), 'Extrapolated Curve'])
     plt.grid(True)
-    plt.show()
+    return fig
 
-    # Plotting NTC2 vs Temperature with extrapolated curve
-    plt.figure(figsize=(6, 4))
-    plt.plot(pt100, ntc2, marker='o', color='orange', linewidth=1, markeredgewidth=1, markersize=3)
-    plt.plot(pt100, exp_func(pt100, *popt_ntc2), color='blue', linestyle='--', linewidth=3)
-    plt.xlabel('Temperature [°C]', fontsize=11)
-    plt.ylabel('NTC2 [Ohm]', fontsize=11)
-    # plt.title('NTC2 Resistance vs Temperature with Extrapolated Curve', fontsize=12)
-    plt.legend(['NTC2', 'Extrapolated Curve'])
-    plt.grid(True)
-    plt.show()
 
-    # Plot the EGR sensor vs Temperature
-    plt.figure(figsize=(6, 4))
-    plt.plot(pt100[1:], egr_sens[1:], marker='o', color='blue', linewidth=1, markeredgewidth=1, markersize=2)
+def plot_egr():
+    """ Plot the EGR sensor vs temperature. """
+
+    import matplotlib.pyplot as plt
+
+    data = load_measurements()
+    fig = plt.figure(figsize=(6, 4))
+    plt.plot(data['pt100'][1:], data['egr_sens'][1:], marker='o', color='blue', linewidth=1, markeredgewidth=1, markersize=2)
     plt.xlabel('Temperature [°C]', fontsize=11)
     plt.ylabel('EGR Sensor [V]', fontsize=11)
     # plt.title('EGR Sensor Voltage vs Temperature', fontsize=16)
     plt.grid(True)
-    plt.show()
+    return fig
 
-    # Interpolate the EGR data that are larger than 50 with the linear function
-    egr = egr_sens[egr_sens > 50]
-    temp_egr = pt100[egr_sens > 50]
-    popt_egr, pcov_egr = curve_fit(linear_func, temp_egr, egr)
 
-    # Plot the EGR sensor vs Temperature with extrapolated curve
-    plt.figure(figsize=(6, 4))
-    plt.plot(pt100[1:], egr_sens[1:], marker='o', color='orange', linewidth=1, markeredgewidth=1, markersize=3)
-    plt.plot(pt100[1:], linear_func(pt100[1:], *popt_egr), color='blue', linestyle='--', linewidth=3)
+def plot_egr_fit(popt):
+    """ Plot the EGR sensor vs temperature with the extrapolated curve. """
+
+    import matplotlib.pyplot as plt
+
+    data = load_measurements()
+    pt100 = data['pt100']
+    fig = plt.figure(figsize=(6, 4))
+    plt.plot(pt100[1:], data['egr_sens'][1:], marker='o', color='orange', linewidth=1, markeredgewidth=1, markersize=3)
+    plt.plot(pt100[1:], linear_func(pt100[1:], *popt), color='blue', linestyle='--', linewidth=3)
     plt.xlabel('Temperature [°C]', fontsize=11)
     plt.ylabel('EGR Sensor [Ohm]', fontsize=11)
     # plt.title('EGR Sensor Voltage vs Temperature with Extrapolated Curve', fontsize=16)
     plt.legend(['EGR Sensor', 'Extrapolated Curve'])
     plt.grid(True)
-    plt.show()
+    return fig
 
-    # Print the linear function parameters
-    print('EGR Sensor Linear Function Parameters: a =', popt_egr[0], 'b =', popt_egr[1])
 
-    # Plot the NTC1 and NTC2 curves with the ideal characteristic
+def plot_linearization(popt):
+    """ Plot the linearized NTC with the ideal characteristic. """
+
+    import matplotlib.pyplot as plt
+
     t = np.linspace(-40, 125, 100)
     ideal_lin = ideal_characteristic(t)
 
-    # Apply curve fitting for NTC
-    popt_r, pcov_r = curve_fit(voltage_divider, t, ideal_lin, bounds=(0, np.inf))
-    print(f"NTC curve fitting parameters: R1 = {popt_r[0]:.2f}, R2 = {popt_r[1]:.2f}")
-
-    plt.figure(figsize=(6, 4))
-    plt.plot(t, voltage_divider(t, *popt_r), color='blue', linewidth=2)
+    fig = plt.figure(figsize=(6, 4))
+    plt.plot(t, voltage_divider(t, *popt), color='blue', linewidth=2)
     plt.plot(t, ideal_lin, color='green', linewidth=2)
     plt.xlabel('Temperature [°C]', fontsize=11)
     plt.ylabel('Voltage [V]', fontsize=11)
     # plt.title('NTC1, NTC2 and Ideal Characteristic', fontsize=16)
     plt.legend(['Linearized NTC1', 'Ideal Characteristics'])
     plt.grid(True)
+    return fig
+
+
+def figures(params=None):
+    """ List the report figures as (name, function, kwargs, inputs).
+
+    *inputs* are the data files the figure depends on, *kwargs* only hold
+    plain values, so a figure can be rendered in another process.
+    """
+
+    if params is None:
+        params = fit_parameters(load_measurements())
+    params = {name: popt.tolist() for name, popt in params.items()}
+    inputs = [DATA]
+    return [
+        ('ntc_1_limits', plot_ntc_limits, {'name': 'ntc1'}, inputs),
+        ('ntc_2_limits', plot_ntc_limits, {'name': 'ntc2'}, inputs),
+        ('ntc_1_extrapolated', plot_ntc_fit, {'name': 'ntc1', 'popt': params['ntc1']}, inputs),
+        ('ntc_2_extrapolated', plot_ntc_fit, {'name': 'ntc2', 'popt': params['ntc2']}, inputs),
+        ('egr_data', plot_egr, {}, inputs),
+        ('egr_extrapolated', plot_egr_fit, {'popt': params['egr']}, inputs),
+        ('linearization', plot_linearization, {'popt': params['divider']}, []),
+    ]
+
 
-    plt.show()
+def calibrations(params):
+    """ Calibrations from the raw readings to °C, see `common.calibration`. """
 
+    return {
+        'ntc1': NtcBeta(*map(float, params['ntc1'])),
+        'ntc2': NtcBeta(*map(float, params['ntc2'])),
+        'egr_sens': Linear(*map(float, params['egr'])),
+    }
+
+
+def main():
+    import matplotlib.pyplot as plt
+
+    params = fit_parameters(load_measurements())
+    popt_ntc1, popt_ntc2 = params['ntc1'], params['ntc2']
+    popt_egr, popt_r = params['egr'], params['divider']
+    print(f"NTC1 curve fitting parameters: a = {popt_ntc1[0]:.2f}, b = {popt_ntc1[1]:.2f}")
+    print(f"NTC2 curve fitting parameters: a = {popt_ntc2[0]:.2f}, b = {popt_ntc2[1]:.2f}")
+    print('EGR Sensor Linear Function Parameters: a =', popt_egr[0], 'b =', popt_egr[1])
+    print(f"NTC curve fitting parameters: R1 = {popt_r[0]:.2f}, R2 = {popt_r[1]:.2f}")
 
+    for name, plot, kwargs, inputs in figures(params):
+        plot(**kwargs)
+        plt.show()
 
 
 if __name__ == '__main__':
@@ -1,37 +1,23 @@
-import numpy as np
+import sys
+from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-def read_numbers_from_file(file_name):
-    numbers = []
-    with open(file_name, 'r') as file:
-        for line in file:
-            # Split the line by spaces assuming each number is separated by spaces
-            line_numbers = line.split(' ')
-            for num in line_numbers:
-                # Convert ASCII representation to integer
-                numbers.append(int(num))
-    return numbers
-
+from common.parser import read_columns
+from common.schema import RECORDING
+from common.stream import iter_blocks, write_npz
 
-file_name = 'linearity.txt'  # Change this to the path of your text file
-numbers_array = read_numbers_from_file(file_name)
 
-lidar_lin = []
-timestamp_lin = []
-ultras_lin = []
+def read_numbers_from_file(file_name):
+    return read_columns(file_name, RECORDING)
 
-for i in range(int(len(numbers_array) / 4)):
-    for j in range(4):
-        if (j == 0):
-            timestamp_lin.append(numbers_array[i * 4 + j])
-        if (j == 1):
-            ultras_lin.append(numbers_array[i * 4 + j])
-        if (j == 2):
-            lidar_lin.append(numbers_array[i * 4 + j])
 
-print("timestamp_30 = ", timestamp_lin)
-print("ultras_30 = ", ultras_lin)
-print("lidar_30 = ", lidar_lin)
+if __name__ == '__main__':
+    # Change this to the paths of your text files
+    file_names = sys.argv[1:] or ['20cm.txt', '25cm.txt', '30cm.txt', 'linearity.txt']
 
-# Save measurements to .npz file
-np.savez('linearity.npz', t=timestamp_lin, ultrasonic=ultras_lin, lidar=lidar_lin)
+    for file_name in file_names:
+        # Save measurements to .npz file, streamed block by block
+        target = Path(file_name).with_suffix('.npz')
+        n_rows = write_npz(iter_blocks(file_name, RECORDING), target, RECORDING)
+        print(f"{file_name}: {n_rows} rows")
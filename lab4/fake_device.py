@@ -0,0 +1,81 @@
+""" Replay a recording as if it came from the sensor board.
+
+The rows are sent in real time according to their timestamps and the
+recording is looped with shifted timestamps, so the stream never ends.
+
+Usage:
+    python fake_device.py 30cm.txt          write to stdout
+    python fake_device.py 30cm.txt 5000     serve on tcp://localhost:5000
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from common.parser import read_columns
+from common.schema import RECORDING
+
+
+async def replay(write, columns, speed=1.0):
+    """ Send *columns* line by line through the coroutine *write* forever. """
+
+    t = columns['t'].astype(np.int64)
+    rows = np.column_stack([t] + [columns[c.name] for c in RECORDING.columns[1:]])
+    period = int(t[-1] - t[0]) + int(np.median(np.diff(t)))
+
+    # Rows sharing a timestamp are sent together
+    starts = np.flatnonzero(np.diff(t, prepend=t[0] - 1))
+    offset = 0
+    while True:
+        for i, j in zip(starts, np.append(starts[1:], len(t))):
+            block = rows[i:j].copy()
+            block[:, 0] += offset
+            await write(''.join(' '.join(map(str, row)) + '\n' for row in block.tolist()).encode())
+            if j < len(t):
+                await asyncio.sleep((t[j] - t[i]) / 1000 / speed)
+        offset += period
+        await asyncio.sleep((period - (t[-1] - t[0])) / 1000 / speed)
+
+
+async def serve(columns, port):
+    async def handle(reader, writer):
+        async def write(data):
+            writer.write(data)
+            await writer.drain()
+
+        try:
+            await replay(write, columns)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, 'localhost', port)
+    async with server:
+        await server.serve_forever()
+
+
+async def to_stdout(columns):
+    async def write(data):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    await replay(write, columns)
+
+
+def main():
+    columns = read_columns(sys.argv[1], RECORDING)
+    try:
+        if len(sys.argv) > 2:
+            asyncio.run(serve(columns, int(sys.argv[2])))
+        else:
+            asyncio.run(to_stdout(columns))
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+
+
+if __name__ == '__main__':
+    main()
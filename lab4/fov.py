@@ -0,0 +1,92 @@
+""" Measure the FOV of both sensors from the FOV recordings.
+
+Echo spikes and dropouts are removed with a `common.filters.Hampel` filter,
+then the passes of the target are found in every recording with
+`common.edges.find_passes`, then the FOV of all passes of all distances is
+computed in one call of `fov_angle`. The distance of a recording is taken
+from its name, e.g. ``25cm.txt``.
+
+Usage: python fov.py [recording ...]
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from common import cache
+from common.edges import find_passes
+from common.filters import Hampel
+from common.schema import RECORDING
+from vis import DATA_DIR, fov_angle
+
+RECORDINGS = ['20cm.txt', '25cm.txt', '30cm.txt']
+SENSORS = ['lidar', 'ultra_sound']
+# Samples in the spike filter window and the sensor resolution in cm
+SPIKE_WINDOW = 5
+RESOLUTION = 1.0
+
+
+def recording_distance(file_name):
+    return float(Path(file_name).stem.removesuffix('cm'))
+
+
+def find_all_passes(file_names=RECORDINGS):
+    """ Passes of the target in every recording.
+
+    Returns:
+        dict mapping the sensor to a dict of flat arrays over all passes:
+        'distance' in cm, 'entry' and 'exit' in s from the start of the recording
+    """
+
+    passes = {sensor: {'distance': [], 'entry': [], 'exit': []} for sensor in SENSORS}
+    for file_name in file_names:
+        data = cache.load(DATA_DIR / file_name, RECORDING)
+        time = (data['t'] - data['t'][0]) / 1000
+        for sensor in SENSORS:
+            values, _ = Hampel(SPIKE_WINDOW, min_sigma=RESOLUTION).update(data[sensor])
+            entries, exits = find_passes(time, values)
+            passes[sensor]['distance'].append(np.full(len(entries), recording_distance(file_name)))
+            passes[sensor]['entry'].append(entries)
+            passes[sensor]['exit'].append(exits)
+    return {sensor: {name: np.concatenate(values) for name, values in columns.items()}
+            for sensor, columns in passes.items()}
+
+
+def measure_FOV(file_names=RECORDINGS):
+    """ FOV of every pass and per distance, from the mean duration of its passes.
+
+    Returns:
+        dict mapping the sensor to a dict with the per-pass arrays of
+        `find_all_passes` plus 'duration' and 'fov', and the per-distance
+        arrays 'distances' and 'distance_fov' in degrees
+    """
+
+    results = {}
+    for sensor, passes in find_all_passes(file_names).items():
+        duration = passes['exit'] - passes['entry']
+        distances, group = np.unique(passes['distance'], return_inverse=True)
+        mean_duration = np.bincount(group, duration) / np.bincount(group)
+        results[sensor] = {
+            **passes,
+            'duration': duration,
+            'fov': fov_angle(duration, passes['distance']),
+            'distances': distances,
+            'distance_fov': fov_angle(mean_duration, distances),
+        }
+    return results
+
+
+def main():
+    file_names = sys.argv[1:] or RECORDINGS
+    for sensor, result in measure_FOV(file_names).items():
+        print(f"{sensor}:")
+        for d, entry, exit, fov in zip(result['distance'], result['entry'], result['exit'], result['fov']):
+            print(f"  {d:5.0f} cm  pass {entry:6.2f} - {exit:6.2f} s  FOV {fov:5.1f}°")
+        for d, fov in zip(result['distances'], result['distance_fov']):
+            print(f"  {d:5.0f} cm  FOV {fov:5.1f}°")
+
+
+if __name__ == '__main__':
+    main()
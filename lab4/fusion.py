@@ -0,0 +1,105 @@
+""" Fuse the lidar and ultrasonic distances into one estimate.
+
+Every recording is put on a common 20 ms clock, both sensors are corrected
+with the linearity calibrations of `linearization.py`, and all recordings are
+smoothed together as one batch by the constant-velocity Kalman filter and RTS
+smoother of `common.kalman`. Shorter recordings are padded with NaN, which the
+filter treats as missing measurements. The noise of each sensor is the mean
+rolling standard deviation measured by `snr.py`.
+
+Usage: python fusion.py [--q Q] [recording ...]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from common import cache
+from common.kalman import kalman_filter, rts_smoother
+from common.schema import RECORDING
+from common.timebase import resample
+
+DATA_DIR = Path(__file__).parent
+RECORDINGS = ['20cm.txt', '25cm.txt', '30cm.txt']
+SENSORS = ['lidar', 'ultra_sound']
+# Common clock in ms
+PERIOD = 20
+# Spectral density of the target acceleration in cm²/s³, a hand-moved target
+Q_DENSITY = 200.0
+
+
+def noise_variances(file_name='snr.txt'):
+    """ Measurement noise variance of every sensor in cm² from a static recording. """
+
+    from snr import characterize
+
+    result = characterize(DATA_DIR / file_name)
+    return np.array([result[sensor]['rolling_std'].mean ** 2 for sensor in SENSORS])
+
+
+def load_batch(file_names):
+    """ Calibrated distances of all recordings on a common clock.
+
+    Returns:
+        (t, z): times in s of the longest recording and the
+        (recordings, steps, sensors) distances in cm, NaN-padded
+    """
+
+    from linearization import calibrations
+
+    corrections = calibrations()
+    tracks = []
+    for file_name in file_names:
+        data = cache.load(DATA_DIR / file_name, RECORDING)
+        data = resample(data['t'], {sensor: data[sensor] for sensor in SENSORS}, PERIOD)
+        tracks.append(np.stack([corrections[sensor](data[sensor]) for sensor in SENSORS], axis=-1))
+
+    z = np.full((len(tracks), max(map(len, tracks)), len(SENSORS)), np.nan)
+    for i, track in enumerate(tracks):
+        z[i, :len(track)] = track
+    return np.arange(z.shape[1]) * PERIOD / 1000, z
+
+
+def fuse(file_names=RECORDINGS, q=Q_DENSITY, r=None):
+    """ Smoothed distance of every recording.
+
+    Returns:
+        dict with the times 't' in s, the calibrated measurements 'z' and the
+        fused 'distance', 'velocity' and 'std' of the distance, all
+        (recordings, steps, ...) arrays NaN past the end of a recording
+    """
+
+    t, z = load_batch(file_names)
+    r = noise_variances() if r is None else r
+    dt = PERIOD / 1000
+    smoothed = rts_smoother(kalman_filter(z, r, dt, q), dt)
+
+    padding = np.isnan(z).all(axis=-1)
+    distance, velocity = (np.where(padding, np.nan, smoothed['x'][..., i]) for i in range(2))
+    std = np.where(padding, np.nan, np.sqrt(smoothed['p'][..., 0, 0]))
+    return {'t': t, 'z': z, 'distance': distance, 'velocity': velocity, 'std': std}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recordings', nargs='*', default=RECORDINGS)
+    parser.add_argument('--q', type=float, default=Q_DENSITY, help='acceleration noise density in cm²/s³')
+    args = parser.parse_args()
+
+    r = noise_variances()
+    print("noise std: " + ', '.join(f"{sensor} {np.sqrt(v):.2f} cm" for sensor, v in zip(SENSORS, r)))
+    result = fuse(args.recordings, args.q, r)
+    for i, file_name in enumerate(args.recordings):
+        valid = ~np.isnan(result['distance'][i])
+        residuals = ', '.join(
+            f"{sensor} {np.sqrt(np.nanmean((result['z'][i, :, j] - result['distance'][i]) ** 2)):.2f} cm"
+            for j, sensor in enumerate(SENSORS))
+        print(f"{file_name}: {valid.sum()} steps, fused std {np.mean(result['std'][i][valid]):.2f} cm, "
+              f"rms residual {residuals}")
+
+
+if __name__ == '__main__':
+    main()
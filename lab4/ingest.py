@@ -0,0 +1,31 @@
+""" Keep the cache of a recording in sync while the device is appending to it.
+
+Usage: python ingest.py 30cm.txt [interval_s]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from common import cache
+from common.schema import RECORDING
+
+
+def main():
+    file_name = sys.argv[1]
+    interval = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+
+    rows = None
+    while True:
+        start = time.perf_counter()
+        meta = cache.update(file_name, RECORDING)
+        if meta['rows'] != rows:
+            print(f"{file_name}: {meta['rows']} rows "
+                  f"(+{meta['rows'] - (rows or 0)} in {time.perf_counter() - start:.3f} s)")
+            rows = meta['rows']
+        time.sleep(interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+""" Delay of the ultrasonic sensor behind the lidar and its drift.
+
+Both sensors are resampled block by block onto a common clock with
+`common.timebase.iter_resampled`, then cross-correlated over sliding windows
+with `common.xcorr.CrossCorrelation`. The result is a lag-vs-time series per
+recording; windows where the sensors do not see the same motion (low
+correlation peak) are left out of the summary.
+
+Usage: python latency.py [--window S] [--step S] [recording ...]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from common import cache
+from common.schema import RECORDING
+from common.timebase import iter_resampled
+from common.xcorr import CrossCorrelation
+
+DATA_DIR = Path(__file__).parent
+RECORDINGS = ['20cm.txt', '25cm.txt', '30cm.txt']
+# Common clock of both sensors in ms
+PERIOD = 20
+# Windows whose correlation peak is lower are not trusted
+MIN_PEAK = 0.8
+
+
+def sensor_lag(file_name, window=10.0, step=2.5, max_lag=1.0):
+    """ Lag of the ultrasonic sensor behind the lidar over sliding windows.
+
+    Args:
+        file_name: recording
+        window, step, max_lag: window length, window spacing and largest lag in s
+
+    Returns:
+        dict of per-window arrays: the window center 't' in s from the start
+        of the recording, the 'lag' in s, positive when the ultrasonic sensor
+        reacts later, and the correlation 'peak'
+    """
+
+    samples = 1000 / PERIOD
+    correlation = CrossCorrelation(round(window * samples), max(round(step * samples), 1),
+                                   round(max_lag * samples))
+    data = cache.load(DATA_DIR / file_name, RECORDING)
+    for block in iter_resampled(data['t'], {'lidar': data['lidar'], 'ultra_sound': data['ultra_sound']},
+                                PERIOD):
+        correlation.update(block['lidar'], block['ultra_sound'])
+
+    result = correlation.result()
+    return {
+        't': result['center'] / samples,
+        'lag': result['lag'] / samples,
+        'peak': result['peak'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recordings', nargs='*', default=RECORDINGS)
+    parser.add_argument('--window', type=float, default=10.0, help='window length in s')
+    parser.add_argument('--step', type=float, default=2.5, help='window spacing in s')
+    args = parser.parse_args()
+
+    for file_name in args.recordings:
+        lag = sensor_lag(file_name, args.window, args.step)
+        trusted = lag['peak'] >= MIN_PEAK
+        print(f"{file_name}:")
+        for t, value, peak in zip(lag['t'], lag['lag'], lag['peak']):
+            print(f"  {t:7.2f} s  lag {1000 * value:7.1f} ms  peak {peak:5.2f}{'' if peak >= MIN_PEAK else '  (ignored)'}")
+        if trusted.any():
+            print(f"  median lag {1000 * np.median(lag['lag'][trusted]):.1f} ms "
+                  f"over {trusted.sum()} of {len(trusted)} windows")
+
+
+if __name__ == '__main__':
+    main()
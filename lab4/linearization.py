@@ -1,28 +1,126 @@
+import sys
+from pathlib import Path
+
 import numpy as np
-import matplotlib.pyplot as plt
 
-# Data
-real_distance = np.array([36, 41, 46, 51, 56, 61, 66, 76])
-lidar_distance = np.array([33, 38, 43, 48, 53, 58, 64, 69])
-ultrasonic_distance = np.array([39, 43, 48, 53, 58, 62, 68, 78])
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from common import cache
+from common.calibration import Linear
+from common.schema import RECORDING
+from common.segment import find_plateaus, merge_plateaus
+
+DATA = Path(__file__).with_name('linearity.txt')
+# Layout of the figure inputs, their caches are built before rendering
+SCHEMA = RECORDING
+SENSORS = ['lidar', 'ultra_sound']
+
+# The rig of linearity.txt moves the target away in 5 cm steps, starting at 36 cm
+FIRST_DISTANCE = 36
+STEP = 5
+STEPS = 9
+# Resolution of the sensors in cm, closer plateau means are the same step
+RESOLUTION = 1.0
+
+
+def linearity_table(path=DATA, first_distance=FIRST_DISTANCE, step=STEP, steps=STEPS):
+    """ Plateaus of a stepped linearity recording.
+
+    Neighbouring plateaus at the same level are one step split by a
+    disturbance and are merged. The distances follow from the order of the
+    plateaus, so a count other than the *steps* of the rig raises ValueError.
+
+    A sensor reading that falls back below an earlier plateau although the
+    target moved away is past the range of the sensor and marked invalid.
+
+    Args:
+        path: recording in the `RECORDING` layout
+        first_distance: distance of the first step in cm
+        step: distance between steps in cm
+        steps: number of steps the rig made, None takes every plateau found
+
+    Returns:
+        dict with the real distance 'real' of every plateau and, for each
+        sensor, the plateau means under its name, the standard deviations under
+        '<sensor>_std' and the validity mask under '<sensor>_valid'
+    """
+
+    data = cache.load(path, RECORDING)
+    time = (data['t'] - data['t'][0]) / 1000
+    plateaus = merge_plateaus(find_plateaus(time, [data[sensor] for sensor in SENSORS]),
+                              min_difference=RESOLUTION)
+    if steps is not None and len(plateaus['start']) != steps:
+        raise ValueError(f"Found {len(plateaus['start'])} plateaus in {Path(path).name}, "
+                         f"the rig made {steps} steps")
+
+    table = {'real': first_distance + step * np.arange(len(plateaus['start']))}
+    for i, sensor in enumerate(SENSORS):
+        mean = plateaus['mean'][:, i]
+        table[sensor] = mean
+        table[f'{sensor}_std'] = plateaus['std'][:, i]
+        table[f'{sensor}_valid'] = mean >= np.maximum.accumulate(mean)
+    return table
+
+
+def linear_fits(table):
+    """ (slope, intercept) of the measured over the real distance per sensor. """
+
+    fits = {}
+    for sensor in SENSORS:
+        valid = table[f'{sensor}_valid']
+        fits[sensor] = np.polyfit(table['real'][valid], table[sensor][valid], 1)
+    return fits
+
+
+def linearization_figure(**rig):
+    """ Measured over real distance with the linear fits, *rig* as for `linearity_table`. """
+
+    import matplotlib.pyplot as plt
+
+    table = linearity_table(**rig)
+    fits = linear_fits(table)
+
+    # Plotting
+    fig = plt.figure(figsize=(6, 4))
+
+    styles = [('lidar', 'blue', 'Lidar'), ('ultra_sound', 'red', 'Ultrasonic')]
+    for sensor, color, label in styles:
+        valid = table[f'{sensor}_valid']
+        plt.errorbar(table['real'][valid], table[sensor][valid], yerr=table[f'{sensor}_std'][valid],
+                     fmt='o', color=color, label=label)
+
+    # Linear extrapolation
+    x_values = np.linspace(30, 80, 100)
+    for sensor, color, label in styles:
+        m, b = fits[sensor]
+        plt.plot(x_values, m * x_values + b, '--', color=color, label=f'{label} Linear Fit', linewidth=2)
+
+    plt.xlabel('Real Distance [cm]')
+    plt.ylabel('Measured Distance [cm]')
+    plt.title('Measured distances of Lidar and Ultrasonic sensors')
+    plt.legend()
+    plt.grid(True)
+    return fig
+
+
+def calibrations(**rig):
+    """ Corrections from the measured to the real distance, see `common.calibration`.
+
+    *rig* is passed to `linearity_table`, the defaults describe linearity.txt.
+    """
+
+    fits = linear_fits(linearity_table(**rig))
+    return {sensor: Linear(*map(float, fit)) for sensor, fit in fits.items()}
+
 
-# Plotting
-plt.figure(figsize=(6, 4))
+def figures():
+    """ List the report figures as (name, function, kwargs, inputs). """
 
-plt.scatter(real_distance, lidar_distance, color='blue', label='Lidar')
-plt.scatter(real_distance, ultrasonic_distance, color='red', label='Ultrasonic')
+    return [('linearization', linearization_figure, {}, [DATA])]
 
-# Linear extrapolation
-m_lidar, b_lidar = np.polyfit(real_distance, lidar_distance, 1)
-m_ultrasonic, b_ultrasonic = np.polyfit(real_distance, ultrasonic_distance, 1)
 
-x_values = np.linspace(30, 80, 100)
-plt.plot(x_values, m_lidar * x_values + b_lidar, '--', color='blue', label='Lidar Linear Fit', linewidth=2)
-plt.plot(x_values, m_ultrasonic * x_values + b_ultrasonic, '--', color='red', label='Ultrasonic Linear Fit', linewidth=2)
+if __name__ == '__main__':
+    import matplotlib.pyplot as plt
 
-plt.xlabel('Real Distance [cm]')
-plt.ylabel('Measured Distance [cm]')
-plt.title('Measured distances of Lidar and Ultrasonic sensors')
-plt.legend()
-plt.grid(True)
-plt.show()
\ No newline at end of file
+    linearization_figure()
+    plt.show()
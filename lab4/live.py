@@ -0,0 +1,202 @@
+""" Live view of the lidar/ultrasonic sensors.
+
+Lines in the usual ``timestamp ultrasonic lidar raw`` format are read by an
+asyncio reader running in a background thread and stored in a ring buffer.
+The plot redraws the buffer at a fixed frame rate with blitting, so neither
+side ever waits for the other.
+
+Usage:
+    python live.py tcp:localhost:5000
+    python live.py serial:/dev/ttyUSB0:115200   (needs pyserial-asyncio)
+    python fake_device.py 30cm.txt | python live.py -
+"""
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from common.parser import parse_bytes
+from common.ringbuffer import RingBuffer
+from common.schema import RECORDING
+
+
+async def open_source(spec):
+    """ Open a line source.
+
+    Args:
+        spec: 'tcp:host:port', 'serial:device:baudrate' or '-' for stdin
+
+    Returns:
+        (reader, writer) pair; the writer must be kept alive, dropping it
+        closes the connection. It is None for stdin.
+    """
+
+    kind, _, address = spec.partition(':')
+    if kind == 'tcp':
+        host, port = address.rsplit(':', 1)
+        return await asyncio.open_connection(host, int(port))
+    if kind == 'serial':
+        import serial_asyncio
+
+        device, baudrate = address.rsplit(':', 1)
+        return await serial_asyncio.open_serial_connection(url=device, baudrate=int(baudrate))
+    if spec == '-':
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+        return reader, None
+    raise ValueError(f"Unknown source {spec}")
+
+
+async def ingest(reader, ring, schema=RECORDING, read_bytes=1 << 16):
+    """ Parse everything *reader* delivers into *ring* until the stream ends.
+
+    Whatever arrived since the last read is parsed in one call; only the
+    unfinished last line is kept for the next round. The first line is
+    dropped, the connection may have started in the middle of it.
+    """
+
+    tail = None
+    while True:
+        data = await reader.read(read_bytes)
+        if not data:
+            break
+        if tail is None:
+            start = data.find(b'\n') + 1
+            if not start:
+                continue
+            data, tail = data[start:], b''
+        data = tail + data
+        cut = data.rfind(b'\n') + 1
+        tail = data[cut:]
+        if cut:
+            try:
+                ring.extend(parse_bytes(data[:cut], schema))
+            except ValueError:
+                _extend_valid_lines(ring, data[:cut], schema)
+
+
+def _extend_valid_lines(ring, data, schema):
+    """ Parse *data* line by line, so a garbled line loses only itself. """
+
+    rows = []
+    for line in data.splitlines():
+        try:
+            rows.append(parse_bytes(line, schema))
+        except ValueError as e:
+            print(f"Skipping malformed line {line[:80]!r}: {e}", file=sys.stderr)
+    if rows:
+        ring.extend({name: np.concatenate([row[name] for row in rows]) for name in rows[0]})
+
+
+def start_ingest(spec, ring):
+    """ Run the reader for *spec* in a daemon thread with its own event loop. """
+
+    async def run():
+        reader, writer = await open_source(spec)
+        try:
+            await ingest(reader, ring)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    thread = threading.Thread(target=asyncio.run, args=(run(),), daemon=True)
+    thread.start()
+    return thread
+
+
+class LiveView:
+    """ Blitted plot of the last *window* seconds held in a ring buffer.
+
+    The axes limits are fixed, so the background (axes, ticks, grid) is
+    rendered once and restored each frame; only the two lines are redrawn.
+    All frame buffers are allocated up front.
+
+    Args:
+        ring: `common.ringbuffer.RingBuffer` filled by the reader
+        window: visible time span in s
+        ylim: fixed distance range in cm
+        fps: redraw rate
+    """
+
+    def __init__(self, ring, window=10.0, ylim=(0, 100), fps=30):
+        import matplotlib.pyplot as plt
+
+        self.ring = ring
+        self.window = window
+        self.snapshot = ring.empty_like()
+        self.x = np.empty(ring.capacity)
+        self.ultra = np.empty(ring.capacity)
+        self.lidar = np.empty(ring.capacity)
+        self.last_total = -1
+
+        self.fig, self.ax = plt.subplots(figsize=(6, 4))
+        self.ax.set_xlim(-window, 0)
+        self.ax.set_ylim(*ylim)
+        self.ax.set_xlabel('Time [s]', fontsize=11)
+        self.ax.set_ylabel('Distance [cm]', fontsize=11)
+        self.ax.grid(True)
+        self.lines = [
+            self.ax.plot([], [], color='blue', linewidth=1, animated=True)[0],
+            self.ax.plot([], [], color='green', linewidth=1, animated=True)[0],
+        ]
+        self.ax.legend(self.lines, ['Ultrasonic Sensor', 'Lidar Sensor'], loc='upper left')
+
+        self.background = None
+        self.fig.canvas.mpl_connect('draw_event', self.on_draw)
+        self.timer = self.fig.canvas.new_timer(interval=int(1000 / fps))
+        self.timer.add_callback(self.update)
+        self.timer.start()
+
+    def on_draw(self, event):
+        # Full redraws (first show, resize) invalidate the saved background
+        self.background = self.fig.canvas.copy_from_bbox(self.ax.bbox)
+        self.draw_lines()
+
+    def update(self):
+        if self.background is None or self.ring.total == self.last_total:
+            return
+        self.last_total = self.ring.total
+
+        n = self.ring.snapshot(self.snapshot)
+        if n == 0:
+            return
+        t = self.snapshot['t'][:n]
+        # Seconds relative to the newest sample, computed in place
+        np.subtract(t, t[-1], out=self.x[:n])
+        self.x[:n] /= 1000
+        np.copyto(self.ultra[:n], self.snapshot['ultra_sound'][:n])
+        np.copyto(self.lidar[:n], self.snapshot['lidar'][:n])
+
+        # Only the visible part of the buffer is handed to the lines
+        i = np.searchsorted(self.x[:n], -self.window)
+        self.lines[0].set_data(self.x[i:n], self.ultra[i:n])
+        self.lines[1].set_data(self.x[i:n], self.lidar[i:n])
+        self.fig.canvas.restore_region(self.background)
+        self.draw_lines()
+        self.fig.canvas.blit(self.ax.bbox)
+
+    def draw_lines(self):
+        for line in self.lines:
+            self.ax.draw_artist(line)
+
+
+def main():
+    import matplotlib.pyplot as plt
+
+    spec = sys.argv[1] if len(sys.argv) > 1 else 'tcp:localhost:5000'
+    # About 15 minutes of data at the ~70 rows/s the device produces
+    ring = RingBuffer(RECORDING, capacity=60_000)
+    start_ingest(spec, ring)
+
+    # Keep a reference, otherwise the timer is garbage collected
+    view = LiveView(ring)
+    plt.show()
+
+
+if __name__ == '__main__':
+    main()
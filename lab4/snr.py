@@ -0,0 +1,89 @@
+""" Noise statistics of the distance sensors in a recording.
+
+The recordings are streamed block by block through the shared parser, so
+memory stays constant however long they are. Every file is characterized on
+its own and the results are merged: mean, standard deviation and SNR of
+each sensor, the spread of the short-term noise over a rolling window, and
+the Allan deviation at octave averaging times.
+
+Usage: python snr.py [--window N] [recording ...]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from common.schema import RECORDING
+from common.stats import AllanDeviation, RollingWindow, RunningStats
+from common.stream import iter_blocks
+
+DATA_DIR = Path(__file__).parent
+SENSORS = ['ultra_sound', 'lidar']
+
+
+def characterize(file_name, window=50, levels=12):
+    """ Noise statistics of one recording.
+
+    Returns:
+        dict mapping the sensor to a dict with the `RunningStats` 'stats', the
+        `AllanDeviation` 'allan' and the `RunningStats` of the rolling
+        standard deviation 'rolling_std', plus the sample period 'dt' in s
+    """
+
+    result = {sensor: {'stats': RunningStats(), 'allan': AllanDeviation(levels), 'rolling_std': RunningStats()}
+              for sensor in SENSORS}
+    windows = {sensor: RollingWindow(window) for sensor in SENSORS}
+    first = last = None
+    count = 0
+    for block in iter_blocks(file_name, RECORDING):
+        first = block['t'][0] if first is None else first
+        last = block['t'][-1]
+        count += len(block['t'])
+        for sensor in SENSORS:
+            values, stats = block[sensor], result[sensor]
+            stats['stats'].update(values)
+            stats['allan'].update(values)
+            _, std = windows[sensor].update(values)
+            stats['rolling_std'].update(std[~np.isnan(std)])
+
+    result['dt'] = (int(last) - int(first)) / 1000 / (count - 1)
+    return result
+
+
+def merge(results):
+    """ Merge the results of `characterize` for several recordings. """
+
+    merged = results[0]
+    for result in results[1:]:
+        for sensor in SENSORS:
+            for name, stats in merged[sensor].items():
+                stats.merge(result[sensor][name])
+    merged['dt'] = np.mean([result['dt'] for result in results])
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recordings', nargs='*', default=[DATA_DIR / 'snr.txt'])
+    parser.add_argument('--window', type=int, default=50, help='samples in the rolling window')
+    args = parser.parse_args()
+
+    result = merge([characterize(file_name, args.window) for file_name in args.recordings])
+    dt = result['dt']
+    for sensor in SENSORS:
+        stats, allan, rolling = (result[sensor][name] for name in ('stats', 'allan', 'rolling_std'))
+        print(f"{sensor}:")
+        print(f"  mean {stats.mean:.3f} cm, std {stats.std:.3f} cm, SNR {stats.snr:.1f} ({stats.snr_db:.1f} dB)")
+        print(f"  rolling std over {args.window * dt:.2f} s: mean {rolling.mean:.3f} cm, "
+              f"min {rolling.min:.3f} cm, max {rolling.max:.3f} cm")
+        print("  Allan deviation:")
+        for tau, adev, n in zip(allan.m * dt, allan.adev, allan.count):
+            if n:
+                print(f"    tau {tau:8.2f} s  {adev:.4f} cm  ({n} differences)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,279 +1,34 @@
-import numpy as np
-import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
+import sys
+from pathlib import Path
 
-from matplotlib.backend_bases import MouseEvent
-from matplotlib.widgets import Cursor
+import numpy as np
 
-import matplotlib
+sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-matplotlib.use('TkAgg')
+from common import cache
+from common.lod import DecimatedLine
+from common.schema import RECORDING
+from common.spectrum import WelchPSD
+from common.timebase import iter_resampled
 
-
-class AnnotatedCursor(Cursor):
-    """
-    A crosshair cursor like `~matplotlib.widgets.Cursor` with a text showing \
-    the current coordinates.
-
-    For the cursor to remain responsive you must keep a reference to it.
-    The data of the axis specified as *dataaxis* must be in ascending
-    order. Otherwise, the `numpy.searchsorted` call might fail and the text
-    disappears. You can satisfy the requirement by sorting the data you plot.
-    Usually the data is already sorted (if it was created e.g. using
-    `numpy.linspace`), but e.g. scatter plots might cause this problem.
-    The cursor sticks to the plotted line.
-
-    Parameters
-    ----------
-    line : `matplotlib.lines.Line2D`
-        The plot line from which the data coordinates are displayed.
-
-    numberformat : `python format string <https://docs.python.org/3/\
-    library/string.html#formatstrings>`_, optional, default: "{0:.4g};{1:.4g}"
-        The displayed text is created by calling *format()* on this string
-        with the two coordinates.
-
-    offset : (float, float) default: (5, 5)
-        The offset in display (pixel) coordinates of the text position
-        relative to the cross-hair.
-
-    dataaxis : {"x", "y"}, optional, default: "x"
-        If "x" is specified, the vertical cursor line sticks to the mouse
-        pointer. The horizontal cursor line sticks to *line*
-        at that x value. The text shows the data coordinates of *line*
-        at the pointed x value. If you specify "y", it works in the opposite
-        manner. But: For the "y" value, where the mouse points to, there might
-        be multiple matching x values, if the plotted function is not biunique.
-        Cursor and text coordinate will always refer to only one x value.
-        So if you use the parameter value "y", ensure that your function is
-        biunique.
-
-    Other Parameters
-    ----------------
-    textprops : `matplotlib.text` properties as dictionary
-        Specifies the appearance of the rendered text object.
-
-    **cursorargs : `matplotlib.widgets.Cursor` properties
-        Arguments passed to the internal `~matplotlib.widgets.Cursor` instance.
-        The `matplotlib.axes.Axes` argument is mandatory! The parameter
-        *useblit* can be set to *True* in order to achieve faster rendering.
-
-    """
-
-    def __init__(self, line, numberformat="{0:.4g};{1:.4g}", offset=(5, 5),
-                 dataaxis='x', textprops=None, **cursorargs):
-        if textprops is None:
-            textprops = {}
-        # The line object, for which the coordinates are displayed
-        self.line = line
-        # The format string, on which .format() is called for creating the text
-        self.numberformat = numberformat
-        # Text position offset
-        self.offset = np.array(offset)
-        # The axis in which the cursor position is looked up
-        self.dataaxis = dataaxis
-
-        # First call baseclass constructor.
-        # Draws cursor and remembers background for blitting.
-        # Saves ax as class attribute.
-        super().__init__(**cursorargs)
-
-        # Default value for position of text.
-        self.set_position(self.line.get_xdata()[0], self.line.get_ydata()[0])
-        # Create invisible animated text
-        self.text = self.ax.text(
-            self.ax.get_xbound()[0],
-            self.ax.get_ybound()[0],
-            "0, 0",
-            animated=bool(self.useblit),
-            visible=False, **textprops)
-        # The position at which the cursor was last drawn
-        self.lastdrawnplotpoint = None
-
-    def onmove(self, event):
-        """
-        Overridden draw callback for cursor. Called when moving the mouse.
-        """
-
-        # Leave method under the same conditions as in overridden method
-        if self.ignore(event):
-            self.lastdrawnplotpoint = None
-            return
-        if not self.canvas.widgetlock.available(self):
-            self.lastdrawnplotpoint = None
-            return
-
-        # If the mouse left drawable area, we now make the text invisible.
-        # Baseclass will redraw complete canvas after, which makes both text
-        # and cursor disappear.
-        if event.inaxes != self.ax:
-            self.lastdrawnplotpoint = None
-            self.text.set_visible(False)
-            super().onmove(event)
-            return
-
-        # Get the coordinates, which should be displayed as text,
-        # if the event coordinates are valid.
-        plotpoint = None
-        if event.xdata is not None and event.ydata is not None:
-            # Get plot point related to current x position.
-            # These coordinates are displayed in text.
-            plotpoint = self.set_position(event.xdata, event.ydata)
-            # Modify event, such that the cursor is displayed on the
-            # plotted line, not at the mouse pointer,
-            # if the returned plot point is valid
-            if plotpoint is not None:
-                event.xdata = plotpoint[0]
-                event.ydata = plotpoint[1]
-
-        # If the plotpoint is given, compare to last drawn plotpoint and
-        # return if they are the same.
-        # Skip even the call of the base class, because this would restore the
-        # background, draw the cursor lines and would leave us the job to
-        # re-draw the text.
-        if plotpoint is not None and plotpoint == self.lastdrawnplotpoint:
-            return
-
-        # Baseclass redraws canvas and cursor. Due to blitting,
-        # the added text is removed in this call, because the
-        # background is redrawn.
-        super().onmove(event)
-
-        # Check if the display of text is still necessary.
-        # If not, just return.
-        # This behaviour is also cloned from the base class.
-        if not self.get_active() or not self.visible:
-            return
-
-        # Draw the widget, if event coordinates are valid.
-        if plotpoint is not None:
-            # Update position and displayed text.
-            # Position: Where the event occurred.
-            # Text: Determined by set_position() method earlier
-            # Position is transformed to pixel coordinates,
-            # an offset is added there and this is transformed back.
-            temp = [event.xdata, event.ydata]
-            temp = self.ax.transData.transform(temp)
-            temp = temp + self.offset
-            temp = self.ax.transData.inverted().transform(temp)
-            self.text.set_position(temp)
-            self.text.set_text(self.numberformat.format(*plotpoint))
-            self.text.set_visible(self.visible)
-
-            # Tell base class, that we have drawn something.
-            # Baseclass needs to know, that it needs to restore a clean
-            # background, if the cursor leaves our figure context.
-            self.needclear = True
-
-            # Remember the recently drawn cursor position, so events for the
-            # same position (mouse moves slightly between two plot points)
-            # can be skipped
-            self.lastdrawnplotpoint = plotpoint
-        # otherwise, make text invisible
-        else:
-            self.text.set_visible(False)
-
-        # Draw changes. Cannot use _update method of baseclass,
-        # because it would first restore the background, which
-        # is done already and is not necessary.
-        if self.useblit:
-            self.ax.draw_artist(self.text)
-            self.canvas.blit(self.ax.bbox)
-        else:
-            # If blitting is deactivated, the overridden _update call made
-            # by the base class immediately returned.
-            # We still have to draw the changes.
-            self.canvas.draw_idle()
-
-    def set_position(self, xpos, ypos):
-        """
-        Finds the coordinates, which have to be shown in text.
-
-        The behaviour depends on the *dataaxis* attribute. Function looks
-        up the matching plot coordinate for the given mouse position.
-
-        Parameters
-        ----------
-        xpos : float
-            The current x position of the cursor in data coordinates.
-            Important if *dataaxis* is set to 'x'.
-        ypos : float
-            The current y position of the cursor in data coordinates.
-            Important if *dataaxis* is set to 'y'.
-
-        Returns
-        -------
-        ret : {2D array-like, None}
-            The coordinates which should be displayed.
-            *None* is the fallback value.
-        """
-
-        # Get plot line data
-        xdata = self.line.get_xdata()
-        ydata = self.line.get_ydata()
-
-        # The dataaxis attribute decides, in which axis we look up which cursor
-        # coordinate.
-        if self.dataaxis == 'x':
-            pos = xpos
-            data = xdata
-            lim = self.ax.get_xlim()
-        elif self.dataaxis == 'y':
-            pos = ypos
-            data = ydata
-            lim = self.ax.get_ylim()
-        else:
-            raise ValueError(f"The data axis specifier {self.dataaxis} should "
-                             f"be 'x' or 'y'")
-
-        # If position is valid and in valid plot data range.
-        if pos is not None and lim[0] <= pos <= lim[-1]:
-            # Find closest x value in sorted x vector.
-            # This requires the plotted data to be sorted.
-            index = np.searchsorted(data, pos)
-            # Return none, if this index is out of range.
-            if index < 0 or index >= len(data):
-                return None
-            # Return plot point as tuple.
-            return (xdata[index], ydata[index])
-
-        # Return none if there is no good related point for this x position.
-        return None
-
-    def clear(self, event):
-        """
-        Overridden clear callback for cursor, called before drawing the figure.
-        """
-
-        # The base class saves the clean background for blitting.
-        # Text and cursor are invisible,
-        # until the first mouse move event occurs.
-        super().clear(event)
-        if self.ignore(event):
-            return
-        self.text.set_visible(False)
-
-    def _update(self):
-        """
-        Overridden method for either blitting or drawing the widget canvas.
-
-        Passes call to base class if blitting is activated, only.
-        In other cases, one draw_idle call is enough, which is placed
-        explicitly in this class (see *onmove()*).
-        In that case, `~matplotlib.widgets.Cursor` is not supposed to draw
-        something using this method.
-        """
-
-        if self.useblit:
-            super()._update()
+DATA_DIR = Path(__file__).parent
+# Layout of the figure inputs, their caches are built before rendering
+SCHEMA = RECORDING
+# Uniform clock the spectra are computed on, in ms
+PSD_PERIOD = 20
 
 
 def linear_func(t, a, b):
     return a * t + b
 
 
-def plot_FOV():
-    data = np.load('30cm.npz')
+def draw_FOV(ax, file_name='30cm.txt'):
+    """ Draw both sensors of a FOV recording, returns (ultrasonic, lidar) lines. """
+
+    data = cache.load(DATA_DIR / file_name, RECORDING)
+    # The raw samples are drawn, so the cursor reads logged values. Both sensors
+    # are logged in the same rows; `common.timebase` puts them on a uniform
+    # clock for the analyses (latency.py, fusion.py)
     time = data['t']
     lidar = data['lidar']
     ultra = data['ultra_sound']
@@ -281,53 +36,101 @@ def plot_FOV():
     # convert time from ms to s and start from 0
     time = (time - time[0]) / 1000
 
-    # Plotting NTC1 vs Temperature with Low and High Limits
-    fig, ax = plt.subplots(figsize=(6, 4))
-    ax.plot(time, ultra, marker='o', color='blue', linewidth=1, markeredgewidth=1, markersize=2)
-    line = ax.plot(time, lidar, marker='o', color='green', linewidth=1, markeredgewidth=1, markersize=2)
+    # Decimated lines keep pan/zoom smooth on long recordings
+    ultra_line = DecimatedLine(ax, time, ultra, marker='o', color='blue', linewidth=1, markeredgewidth=1, markersize=2)
+    lidar_line = DecimatedLine(ax, time, lidar, marker='o', color='green', linewidth=1, markeredgewidth=1, markersize=2)
     ax.set_xlabel('Time [s]', fontsize=11)
     ax.set_ylabel('Distance [cm]', fontsize=11)
     ax.legend(['Ultrasonic Sensor', 'Lidar Sensor'])
     ax.grid(True)
+    return ultra_line, lidar_line
 
-    cursor = AnnotatedCursor(
-        line=line[0],
-        numberformat="{0:.2f}\n{1:.2f}",
-        dataaxis='x', offset=[10, 10],
-        textprops={'color': 'blue', 'fontweight': 'bold'},
-        ax=ax,
-        useblit=True,
-        color='red',
-        linewidth=2)
-
-    # Simulate a mouse move to (-2, 10), needed for online docs
-    t = ax.transData
-    MouseEvent("motion_notify_event", ax.figure.canvas, *t.transform((-2, 10)))._process()
-
-    plt.show()
 
+def draw_linearity(ax):
+    """ Draw the stepped linearity recording, returns its line. """
 
-def plot_linerity():
-    data = np.load('linearity.npz')
+    data = cache.load(DATA_DIR / 'linearity.txt', RECORDING)
     time = data['t']
     lidar = data['lidar']
-    ultra = data['ultrasonic']
-
-    ultra = np.array(ultra)
-    time = np.array(time)
 
-    # Plotting NTC1 vs Temperature with Low and High Limits
-    fig, ax = plt.subplots(figsize=(6, 4))
-    line = ax.plot(time, lidar, marker='o', color='blue', linewidth=1, markeredgewidth=1, markersize=2)
+    line = DecimatedLine(ax, time, lidar, marker='o', color='blue', linewidth=1, markeredgewidth=1, markersize=2)
     # ax.plot(time, lidar, marker='o', color='green', linewidth=1, markeredgewidth=1, markersize=2)
     ax.set_xlabel('Time [s]', fontsize=11)
     ax.set_ylabel('Distance [cm]', fontsize=11)
     ax.legend(['Ultrasonic Sensor', 'Lidar Sensor'])
     ax.grid(True)
+    return line
+
+
+def draw_psd(ax, file_name='snr.txt', nperseg=512):
+    """ Draw the Welch PSD of both sensors of a recording.
+
+    The irregularly logged samples are resampled onto the uniform `PSD_PERIOD`
+    clock first, block by block, so memory stays bounded.
+    """
+
+    data = cache.load(DATA_DIR / file_name, RECORDING)
+    time = data['t']
+    if len(time) < 2 or time[-1] == time[0]:
+        raise ValueError(f"{file_name} spans no time, it has no spectrum")
+
+    styles = [('ultra_sound', 'blue', 'Ultrasonic Sensor'), ('lidar', 'green', 'Lidar Sensor')]
+    psds = {sensor: WelchPSD(nperseg) for sensor, _, _ in styles}
+    for block in iter_resampled(time, {sensor: data[sensor] for sensor in psds}, PSD_PERIOD):
+        for sensor, psd in psds.items():
+            psd.update(block[sensor])
+
+    for sensor, color, label in styles:
+        frequencies, density = psds[sensor].density(1000 / PSD_PERIOD)
+        ax.semilogy(frequencies[1:], density[1:], color=color, linewidth=1, label=label)
+    ax.set_xlabel('Frequency [Hz]', fontsize=11)
+    ax.set_ylabel('PSD [cm$^2$/Hz]', fontsize=11)
+    ax.legend()
+    ax.grid(True)
+
+
+def psd_figure(file_name='snr.txt'):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    draw_psd(ax, file_name)
+    return fig
+
+
+def fov_figure(file_name='30cm.txt'):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    draw_FOV(ax, file_name)
+    return fig
+
+
+def linearity_figure():
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    draw_linearity(ax)
+    return fig
+
+
+def figures():
+    """ List the report figures as (name, function, kwargs, inputs). """
+
+    recordings = [(f'{d}cm', fov_figure, {'file_name': f'{d}cm.txt'}, [DATA_DIR / f'{d}cm.txt'])
+                  for d in (20, 25, 30)]
+    spectra = [(f'{Path(name).stem}_psd', psd_figure, {'file_name': name}, [DATA_DIR / name])
+               for name in ('snr.txt', '30cm.txt')]
+    return recordings + spectra + [('linearity', linearity_figure, {}, [DATA_DIR / 'linearity.txt'])]
+
+
+def add_cursor(ax, lines, numberformat):
+    from matplotlib.backend_bases import MouseEvent
+
+    from common.cursor import AnnotatedCursor
 
     cursor = AnnotatedCursor(
-        line=line[0],
-        numberformat="{0:.2f}\n{1:.2f}",
+        line=lines,
+        numberformat=numberformat,
         dataaxis='x', offset=[10, 10],
         textprops={'color': 'blue', 'fontweight': 'bold'},
         ax=ax,
@@ -338,65 +141,49 @@ def plot_linerity():
     # Simulate a mouse move to (-2, 10), needed for online docs
     t = ax.transData
     MouseEvent("motion_notify_event", ax.figure.canvas, *t.transform((-2, 10)))._process()
+    return cursor
+
 
+def plot_FOV(file_name='30cm.txt'):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    ultra_line, lidar_line = draw_FOV(ax, file_name)
+    cursor = add_cursor(ax, [lidar_line, ultra_line], "{0:.2f}\n{1:.2f}\n{2:.2f}")
     plt.show()
 
 
-def compute_FOV(t1: float, t2: float, d: float):
-    import math
-    t = (t2 + t1) * 1 / 2
+def plot_linerity():
+    import matplotlib.pyplot as plt
 
-    # Atan2
-    s = 3 * t + 8
-    print(f"s: {s}")
-    x = 2 * math.atan2((3 * t + 8) / 2, d)
-    x = math.degrees(x)
-    return x
+    fig, ax = plt.subplots(figsize=(6, 4))
+    line = draw_linearity(ax)
+    cursor = add_cursor(ax, line, "{0:.2f}\n{1:.2f}")
+    plt.show()
 
 
-if __name__ == '__main__':
-    times_ultra = {
-        '20': [4.45, 4.92],
-        '25': [4.07, 4.13],
-        '30': [4.85, 4.89]
-    }
-
-    times_lidar = {
-        '20': [2.99, 2.98],
-        '25': [3.06, 3.08],
-        '30': [3.19, 3.17]
-    }
-
-    for d in ['20', '25', '30']:
-        t1, t2 = times_lidar[d]
-        print(compute_FOV(t1, t2, int(d)))
+def fov_angle(t, d):
+    """ FOV in degrees from the time *t* in s a pass took at the distance *d* in cm.
 
-    # plot_FOV()
-    plot_linerity()
+    Works elementwise on arrays, e.g. on all passes of all recordings at once.
+    """
+
+    s = 3 * t + 8
+    # Atan2
+    return np.degrees(2 * np.arctan2(s / 2, d))
 
-# ULTRASONIC SENSOR
-# 20 cm:
-# 21.39 - 16.54 = 4.45
-# 35.13 - 30.21 = 4.92
 
-# 25 cm:
-# 10.02 - 5.95 = 4.07
-# 24.15 - 20.02 = 4.13
+def compute_FOV(t1, t2, d):
+    """ FOV in degrees from the times of two passes, see `fov_angle`. """
 
-# 30 cm:
-# 21.39 - 16.54 = 4.85
-# 35.13 - 30.24 = 4.89
+    return fov_angle((t2 + t1) / 2, d)
 
 
-# LIDAR SENSOR
-# 20 cm:
-# 9.23 - 6.24 = 2.99
-# 18.37 - 15.39 = 2.98
+if __name__ == '__main__':
+    import matplotlib
 
-# 25 cm:
-# 9.37 - 6.31 = 3.06
-# 23.69 - 20.61 = 3.08
+    matplotlib.use('TkAgg')
 
-# 30 cm:
-# 20.39 - 17.20 = 3.19
-# 34.31 - 31.14 = 3.17
+    # The FOV of the recordings is measured by fov.py
+    # plot_FOV()
+    plot_linerity()
@@ -0,0 +1,23 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from common.edges import find_passes
+
+
+def test_threshold_below_all_samples():
+    t = np.arange(100) * 0.02
+    entries, exits = find_passes(t, np.full(100, 50.0), threshold=10)
+    assert entries.size == 0 and exits.size == 0
+
+
+def test_single_pass():
+    t = np.arange(200) * 0.02
+    values = np.full(200, 50.0)
+    values[50:120] = 20
+    entries, exits = find_passes(t, values, threshold=40)
+    np.testing.assert_allclose(entries, [1.0])
+    np.testing.assert_allclose(exits, [2.4])
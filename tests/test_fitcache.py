@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from common.fitcache import cached_curve_fit, fit_key
+
+
+def make(k):
+    return lambda x, a: a * x + k
+
+
+def test_closures_with_different_captures():
+    x = np.linspace(0, 10, 50)
+    y = 3 * x + 5
+    assert fit_key(make(5), x, y) != fit_key(make(100), x, y)
+    assert fit_key(make(5), x, y) == fit_key(make(5), x, y)
+
+    popt_5, _ = cached_curve_fit(make(5), x, y, cache_dir=None)
+    popt_100, _ = cached_curve_fit(make(100), x, y, cache_dir=None)
+    np.testing.assert_allclose(popt_5, [3])
+    np.testing.assert_allclose(popt_100, [np.sum(x * (y - 100)) / np.sum(x ** 2)])